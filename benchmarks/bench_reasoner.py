@@ -0,0 +1,184 @@
+"""
+推理引擎性能基准
+
+运行方式:
+  python benchmarks/bench_reasoner.py rete             # 逐条断言事实的单次代价
+  python benchmarks/bench_reasoner.py rete --rules 100000
+  python benchmarks/bench_reasoner.py closure          # 从一组已知事实求完整闭包的代价
+  python benchmarks/bench_reasoner.py memory           # 规则库各表示及推理器合计的每条规则字节数
+  python benchmarks/bench_reasoner.py batch --cases 10000  # 批量推理与逐案例循环对比（需要 numpy）
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.reasoner import ENGINES, RuleReasoner  # noqa: E402
+
+
+def generate_rules(
+    rule_count: int, atom_count: int, seed: int = 0
+) -> tuple[list[tuple[list[str], str]], list[str]]:
+    """
+    生成分层的随机规则库
+    原子事实位于第 0 层，每条规则的前提取自更低层，少量"枢纽"事实出现在大量规则中
+    返回 (规则列表, 原子事实列表)
+    """
+    rnd = random.Random(seed)
+    atoms = [f"a{i}" for i in range(atom_count)]
+    hubs = atoms[:8]
+    layers: list[list[str]] = [atoms]
+    rules: list[tuple[list[str], str]] = []
+
+    per_layer = max(1, rule_count // 4)
+    for layer in range(1, 5):
+        lower = [f for ls in layers for f in ls]
+        conclusions = [f"c{layer}_{i}" for i in range(max(1, per_layer // 3))]
+        for _ in range(per_layer):
+            pres = set(rnd.sample(lower, rnd.randint(1, 4)))
+            if rnd.random() < 0.3:
+                pres.add(rnd.choice(hubs))
+            rules.append((sorted(pres), rnd.choice(conclusions)))
+        layers.append(conclusions)
+
+    return rules, atoms
+
+
+def bench_rete(args: argparse.Namespace) -> None:
+    """逐条断言事实，对比各引擎每次 add_known + find 的平均代价"""
+    rules, atoms = generate_rules(args.rules, args.atoms, args.seed)
+    facts = random.Random(args.seed).sample(atoms, args.facts)
+    print(f"规则数: {len(rules)}  原子事实数: {len(atoms)}  逐条断言: {len(facts)}")
+
+    for engine in ENGINES:
+        rr = RuleReasoner(engine)
+        rr.reset(rules)
+
+        # 首次 find 的建网代价单独统计
+        start = time.perf_counter()
+        rr.find()
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for fact in facts:
+            rr.add_known([fact])
+            rr.find()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{engine:>8}: 首次 find {build * 1000:8.2f} ms, "
+            f"每次断言 {elapsed / len(facts) * 1000:8.3f} ms, 已知 {len(rr._known_set)}"
+        )
+
+
+def bench_closure(args: argparse.Namespace) -> None:
+    """每个案例清空已知事实后一次断言 --facts 个事实，对比各引擎求完整闭包的平均代价"""
+    rules, atoms = generate_rules(args.rules, args.atoms, args.seed)
+    rnd = random.Random(args.seed)
+    cases = [rnd.sample(atoms, args.facts) for _ in range(20)]
+    print(f"规则数: {len(rules)}  案例数: {len(cases)}  每案例事实数: {args.facts}")
+
+    for engine in ENGINES:
+        rr = RuleReasoner(engine)
+        rr.reset(rules)
+        rr.find()  # 预热，构建引擎自身的索引
+
+        elapsed = 0.0
+        for case in cases:
+            rr.clear_known()
+            rr.add_known(case)
+            start = time.perf_counter()
+            rr.find()
+            elapsed += time.perf_counter() - start
+        print(
+            f"{engine:>8}: 每次闭包 {elapsed / len(cases) * 1000:8.2f} ms, 已知 {len(rr._known_set)}"
+        )
+
+
+def _deep_sizeof(obj, seen: set[int] | None = None) -> int:
+    """递归统计容器及其元素占用的字节数（共享的小整数只计一次）"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(_deep_sizeof(x, seen) for x in obj)
+    return size
+
+
+def bench_memory(args: argparse.Namespace) -> None:
+    """
+    统计 _lines_list + _node_list 与 CSR 编译规则库的每条规则字节数
+    CSR 是在列表结构之外额外构建的，推理器的实际占用为两者之和
+    """
+    rules, _ = generate_rules(args.rules, args.atoms, args.seed)
+    rr = RuleReasoner("csr")
+    rr.reset(rules)
+
+    before = _deep_sizeof(rr._lines_list) + _deep_sizeof(rr._node_list)
+    start = time.perf_counter()
+    crb = rr.compile()
+    compile_time = time.perf_counter() - start
+    after = crb.nbytes
+
+    print(f"规则数: {crb.rule_count}  事实数: {crb.fact_count}")
+    print(f"_lines_list + _node_list: {before / crb.rule_count:8.1f} 字节/规则")
+    print(f"CompiledRuleBase (CSR):   {after / crb.rule_count:8.1f} 字节/规则")
+    print(f"合计（engine=\"csr\"）:   {(before + after) / crb.rule_count:8.1f} 字节/规则")
+    print(f"编译耗时: {compile_time * 1000:.1f} ms")
+
+
+def bench_batch(args: argparse.Namespace) -> None:
+    """对比逐案例 clear_known/add_known/find 循环与 find_batch 的吞吐"""
+    rules, atoms = generate_rules(args.rules, args.atoms, args.seed)
+    rnd = random.Random(args.seed)
+    cases = [rnd.sample(atoms, args.facts) for _ in range(args.cases)]
+    print(f"规则数: {len(rules)}  案例数: {len(cases)}  每案例事实数: {args.facts}")
+
+    rr = RuleReasoner("counter")
+    rr.reset(rules)
+    loop_cases = cases[: min(len(cases), 500)]
+    start = time.perf_counter()
+    for case in loop_cases:
+        rr.clear_known()
+        rr.add_known(case)
+        rr.find()
+    loop = (time.perf_counter() - start) / len(loop_cases)
+
+    matrix = rr.encode_cases(cases)
+    rr.find_batch(matrix[:1])  # 预热，构建求解器
+    start = time.perf_counter()
+    rr.find_batch(matrix)
+    batch = (time.perf_counter() - start) / len(cases)
+
+    print(f"逐案例循环: {loop * 1000:8.3f} ms/案例")
+    print(f"find_batch: {batch * 1000:8.3f} ms/案例")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理引擎性能基准")
+    parser.add_argument("case", choices=["rete", "closure", "memory", "batch"], help="基准项目")
+    parser.add_argument("--rules", type=int, default=60000, help="规则数（默认: 60000）")
+    parser.add_argument("--atoms", type=int, default=2000, help="原子事实数（默认: 2000）")
+    parser.add_argument("--facts", type=int, default=200, help="断言的事实数（默认: 200）")
+    parser.add_argument("--cases", type=int, default=2000, help="批量案例数（默认: 2000）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（默认: 0）")
+    args = parser.parse_args()
+
+    cases = {
+        "rete": bench_rete,
+        "closure": bench_closure,
+        "memory": bench_memory,
+        "batch": bench_batch,
+    }
+    cases[args.case](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@
 要求：
 - 已创建虚拟环境，若未安装 pyinstaller，脚本会自动安装
 - 前端已构建：frontend/dist 存在（否则脚本会报错）
-- 三个数据文件 inference_history.json / rules.json / users.json 不会被打包，按需求外置
+- 数据文件 inference_history.jsonl / rules.json（及操作日志 rules.journal.jsonl）/ users.json（或 SQLite 后端的 expert_system.db）不会被打包，按需求外置
 """
 
 from __future__ import annotations
@@ -76,7 +76,7 @@ def build_exe() -> None:
     subprocess.run(cmd, check=True)
 
     print("\n打包完成，生成文件位于 dist/rgzn.exe")
-    print("提示：运行时将 inference_history.json、rules.json、users.json 放在 exe 同目录以便读取/写回。")
+    print("提示：运行时将 inference_history.jsonl、rules.json、users.json 放在 exe 同目录以便读取/写回。")
 
 
 def main() -> None:
@@ -76,8 +76,12 @@ export default {
   clearFacts: () => instance.post('/facts/clear'),
 
   // 推理
-  forwardInference: () => instance.post('/inference/forward'),
-  startBackward: (target) => instance.post('/inference/backward/start', { target }),
+  forwardInference: (data) => instance.post('/inference/forward', data),
+  startBackward: (target, mode) => instance.post('/inference/backward/start', { target, mode }),
+  backwardTree: (target) => instance.get('/inference/backward/tree', { params: { target } }),
+  backwardPlan: (target) => instance.post('/inference/backward/plan', { target }),
+  proveMany: (targets, trueFacts = [], falseFacts = []) =>
+    instance.post('/inference/backward/many', { targets, true_facts: trueFacts, false_facts: falseFacts }),
   continueBackward: (trueFacts, falseFacts) => 
     instance.post('/inference/backward/continue', { true_facts: trueFacts, false_facts: falseFacts }),
 
@@ -5,6 +5,7 @@
   python main.py          # 启动 GUI
   python main.py --web    # 仅启动 Web 服务器
   python main.py --web --port 8080  # 指定端口
+  python main.py --web --storage sqlite  # 使用 SQLite 存储
 """
 
 import argparse
@@ -27,12 +28,12 @@ def run_gui():
     sys.exit(app.exec())
 
 
-def run_web(host: str, port: int):
+def run_web(host: str, port: int, storage: str):
     """启动 Web 服务器"""
     try:
         from src.web.server import run_standalone
 
-        run_standalone(host=host, port=port)
+        run_standalone(host=host, port=port, storage_backend=storage)
     except ImportError as e:
         print(f"错误: 无法导入Web服务器模块 - {e}")
         print("请确保已安装 flask 和 flask-cors:")
@@ -49,6 +50,7 @@ def main():
   python main.py              # 启动 GUI
   python main.py --web        # 仅启动 Web 服务器
   python main.py --web --port 8080  # 指定端口
+  python main.py --web --storage sqlite  # 使用 SQLite 存储
         """,
     )
     parser.add_argument(
@@ -60,11 +62,17 @@ def main():
     parser.add_argument(
         "--port", type=int, default=5000, help="Web 服务器端口（默认: 5000）"
     )
+    parser.add_argument(
+        "--storage",
+        choices=["json", "sqlite"],
+        default="json",
+        help="Web 服务器的存储后端（默认: json）",
+    )
 
     args = parser.parse_args()
 
     if args.web:
-        run_web(host=args.host, port=args.port)
+        run_web(host=args.host, port=args.port, storage=args.storage)
     else:
         run_gui()
 
@@ -0,0 +1,53 @@
+"""
+冲突消解议程
+前提全部满足的规则（激活）按冲突消解策略排序放入堆中，每次触发优先级最高的一条。
+策略：
+- order: 规则顺序，越靠前优先级越高
+- salience: 显著度，数值越大优先级越高，相同时按规则顺序
+- specificity: 特殊性，不同前提越多优先级越高，相同时按规则顺序
+- recency: 新近度，前提中最晚成立的事实越新优先级越高，相同时按规则顺序
+"""
+
+import heapq
+from typing import Optional
+
+# 可选的冲突消解策略
+STRATEGIES: tuple[str, ...] = ("order", "salience", "specificity", "recency")
+
+
+class Agenda:
+    """以堆实现的议程，弹出顺序只由策略和规则id决定，结果确定"""
+
+    def __init__(
+        self,
+        strategy: str,
+        lines_list: list[tuple[list[int], int]],
+        salience: Optional[list[float]] = None,
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的冲突消解策略: {strategy}，可选: {', '.join(STRATEGIES)}")
+        self.strategy = strategy
+        self._lines_list = lines_list
+        self._salience = salience
+        self._heap: list[tuple[int, int]] = []
+
+    def _priority(self, line_id: int, recency: int) -> int:
+        """堆中按该值从小到大弹出"""
+        if self.strategy == "salience":
+            return -self._salience[line_id] if self._salience else 0
+        if self.strategy == "specificity":
+            return -len(set(self._lines_list[line_id][0]))
+        if self.strategy == "recency":
+            return -recency
+        return 0
+
+    def push(self, line_id: int, recency: int = 0) -> None:
+        """加入激活，recency 为前提中最晚成立事实的时间戳"""
+        heapq.heappush(self._heap, (self._priority(line_id, recency), line_id))
+
+    def pop(self) -> int:
+        """弹出优先级最高的激活"""
+        return heapq.heappop(self._heap)[1]
+
+    def __len__(self) -> int:
+        return len(self._heap)
@@ -0,0 +1,112 @@
+"""
+批量正向推理
+对 (案例数 × 事实数) 的布尔矩阵一次性求所有案例的闭包，
+案例按位打包为 uint64，规则满足判定用 CSR 前提关联矩阵上的 NumPy 按位归约完成
+"""
+
+from .compiled import CompiledRuleBase
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _require_numpy():
+    """返回 numpy 模块，未安装时给出安装提示"""
+    if np is None:
+        raise ImportError("批量推理需要 numpy，请先安装: uv sync --extra batch")
+    return np
+
+
+def _pack(matrix):
+    """(案例数 × n) 布尔矩阵 → (n × 字数) uint64 位矩阵，案例补齐到 64 的倍数"""
+    n_cases = matrix.shape[0]
+    padded = np.zeros((matrix.shape[1], -(-n_cases // 64) * 64), dtype=bool)
+    padded[:, :n_cases] = matrix.T
+    return np.packbits(padded, axis=1, bitorder="little").view(np.uint64)
+
+
+def _unpack(bits, n_cases: int):
+    """_pack 的逆变换，返回 (案例数 × n) 布尔矩阵"""
+    unpacked = np.unpackbits(bits.view(np.uint8), axis=1, bitorder="little")
+    return unpacked[:, :n_cases].T.astype(bool)
+
+
+class BatchEvaluator:
+    """基于编译规则库的批量不动点求解器"""
+
+    def __init__(self, crb: CompiledRuleBase) -> None:
+        _require_numpy()
+        self.fact_count = crb.fact_count
+        self.rule_count = crb.rule_count
+
+        # 去掉无前提的规则（正向推理中永远不会被触发）
+        pre_offsets = np.frombuffer(crb.pre_offsets, dtype=np.int32)
+        self.pre_counts = np.frombuffer(crb.pre_counts, dtype=np.int32)
+        self.pre_ids = np.frombuffer(crb.pre_ids, dtype=np.int32)
+        self.ans_ids = np.frombuffer(crb.ans_ids, dtype=np.int32)
+        self.active_rules = np.flatnonzero(self.pre_counts > 0)
+        self.reduce_starts = pre_offsets[self.active_rules]
+
+        # 规则按结论分组，用于把触发结果无重复地汇总到事实列
+        order = np.argsort(self.ans_ids[self.active_rules], kind="stable")
+        self.rules_by_ans = self.active_rules[order]
+        sorted_ans = self.ans_ids[self.rules_by_ans]
+        self.ans_group_starts = np.flatnonzero(np.r_[True, sorted_ans[1:] != sorted_ans[:-1]])
+        self.ans_unique = sorted_ans[self.ans_group_starts] if len(sorted_ans) else sorted_ans
+
+        fwd_offsets = np.frombuffer(crb.fwd_offsets, dtype=np.int32)
+        self.terminal = np.diff(fwd_offsets) == 0
+
+    def run(self, cases, chunk_size: int = 4096):
+        """
+        求所有案例的闭包
+        cases: (案例数 × 事实数) 布尔矩阵，列号即事实id，列数不足时补 False
+        返回 (闭包矩阵, 触发规则矩阵)，形状分别为 (案例数 × 事实数)、(案例数 × 规则数)
+        """
+        cases = np.asarray(cases, dtype=bool)
+        n_cases = cases.shape[0]
+        width = max(cases.shape[1], self.fact_count)
+        closure = np.zeros((n_cases, width), dtype=bool)
+        closure[:, : cases.shape[1]] = cases
+        fired = np.zeros((n_cases, self.rule_count), dtype=bool)
+
+        # 分块控制 (前提总数 × 案例字数) 中间矩阵的内存
+        for begin in range(0, n_cases, chunk_size):
+            end = min(begin + chunk_size, n_cases)
+            known, sat = self._run_chunk(_pack(closure[begin:end, : self.fact_count]))
+            closure[begin:end, : self.fact_count] = _unpack(known, end - begin)
+            fired[begin:end] = _unpack(sat, end - begin)
+
+        return closure, fired
+
+    def _run_chunk(self, known):
+        """
+        known: (事实数 × 字数) 的 uint64 矩阵，每一位对应一个案例
+        每个字同时处理 64 个案例，规则满足即其全部前提行按位与
+        """
+        initial = known.copy()
+        satisfied = np.zeros((self.rule_count, known.shape[1]), dtype=np.uint64)
+        if not len(self.active_rules):
+            return known, satisfied
+
+        while True:
+            satisfied[self.active_rules] = np.bitwise_and.reduceat(
+                known[self.pre_ids], self.reduce_starts, axis=0
+            )
+            derived = np.bitwise_or.reduceat(
+                satisfied[self.rules_by_ans], self.ans_group_starts, axis=0
+            )
+            if not (derived & ~known[self.ans_unique]).any():
+                break
+            known[self.ans_unique] |= derived
+
+        # 结论原本就已知的规则不算触发，与 find() 的路径语义一致
+        return known, satisfied & ~initial[self.ans_ids]
+
+    def conclusions(self, closure) -> list[list[int]]:
+        """每个案例闭包中不参与任何规则的事实id（即 find() 的结论）"""
+        terminal = np.ones(closure.shape[1], dtype=bool)
+        terminal[: self.fact_count] = self.terminal
+        return [np.flatnonzero(row).tolist() for row in closure & terminal]
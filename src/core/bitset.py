@@ -0,0 +1,47 @@
+"""
+位集合表示的事实集
+事实 id 对应大整数中的一位，每条规则预先计算前提掩码，
+"规则满足" 即 known & mask == mask；整个事实集是一个不可变 int，快照无需复制容器
+"""
+
+from .compiled import CompiledRuleBase
+
+
+def ids_to_bits(ids) -> int:
+    """事实id集合 → 位集合"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buf = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def bits_to_ids(bits: int) -> list[int]:
+    """位集合 → 事实id列表（升序）"""
+    ids: list[int] = []
+    for byte_idx, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+        if not byte:
+            continue
+        base = byte_idx << 3
+        for bit in range(8):
+            if byte >> bit & 1:
+                ids.append(base + bit)
+    return ids
+
+
+class BitsetRuleBase:
+    """每条规则的前提掩码，由 CSR 编译规则库派生"""
+
+    def __init__(self, crb: CompiledRuleBase) -> None:
+        pre_offsets, pre_ids = crb.pre_offsets, crb.pre_ids
+        self.masks: list[int] = [
+            ids_to_bits(pre_ids[pre_offsets[r] : pre_offsets[r + 1]])
+            for r in range(crb.rule_count)
+        ]
+
+    def satisfied(self, known: int, line_id: int) -> bool:
+        """规则的全部前提是否都在位集合中"""
+        mask = self.masks[line_id]
+        return known & mask == mask
@@ -0,0 +1,47 @@
+"""
+单次推理调用的工作量预算
+限制触发的规则数、检查的前提数和截止时间，耗尽后推理立即返回已得到的部分结果
+"""
+
+import time
+from typing import Optional
+
+# 每检查多少次计数才读取一次时钟
+_CLOCK_INTERVAL = 256
+
+
+class Budget:
+    """
+    预算对象，每次调用使用一个新对象
+    - max_rules: 最多触发的规则数
+    - max_checks: 最多检查的前提数
+    - timeout: 从创建起的秒数，超过即截止
+    """
+
+    def __init__(
+        self,
+        max_rules: Optional[int] = None,
+        max_checks: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.max_rules = max_rules
+        self.max_checks = max_checks
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.rules = 0  # 已触发的规则数
+        self.checks = 0  # 已检查的前提数
+        self.exhausted = False  # 预算是否已耗尽
+        self._next_clock = _CLOCK_INTERVAL
+
+    def charge(self, rules: int = 0, checks: int = 0) -> bool:
+        """在做这些工作之前记账，返回预算是否已耗尽（耗尽时不应再做这些工作）"""
+        self.rules += rules
+        self.checks += checks
+        if self.max_rules is not None and self.rules > self.max_rules:
+            self.exhausted = True
+        elif self.max_checks is not None and self.checks > self.max_checks:
+            self.exhausted = True
+        elif self.deadline is not None and self.rules + self.checks >= self._next_clock:
+            self._next_clock = self.rules + self.checks + _CLOCK_INTERVAL
+            if time.monotonic() >= self.deadline:
+                self.exhausted = True
+        return self.exhausted
@@ -0,0 +1,194 @@
+"""
+规则库专用求值器代码生成
+为每个事实生成一个处理函数，把它参与的规则的计数递减和触发展开成直线代码，求闭包时不再解释 _lines_list。
+生成的模块按规则库内容哈希缓存在当前用户私有的目录中，规则库不变时直接复用
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import stat
+import sys
+import tempfile
+import types
+import warnings
+from typing import Callable, Optional
+
+from .compiled import CompiledRuleBase
+
+# 生成代码格式版本，格式变化时使旧缓存失效
+_FORMAT_VERSION = 2
+
+# 字节码缓存文件头：魔数 + 规则库哈希 + 源码的 SHA-256
+_CODE_MAGIC = b"ESCG"
+
+
+def _default_cache_dir() -> str:
+    """当前用户的缓存目录（Windows 为 LOCALAPPDATA，其他系统为 XDG_CACHE_HOME 或 ~/.cache）"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "expert_system", "codegen")
+
+
+DEFAULT_CACHE_DIR = _default_cache_dir()
+
+
+def rules_hash(rules: list[tuple[list[str], str]]) -> str:
+    """规则库内容哈希（事实id由规则顺序唯一确定，因此哈希同时确定了id分配）"""
+    payload = json.dumps([_FORMAT_VERSION, rules], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _emit_handler(out: list[str], crb: CompiledRuleBase, fact: int):
+    """生成事实成立时的处理函数：以它为前提的规则计数减一，归零且结论未知时触发"""
+    out.append(f"def _f{fact}(r, k, add, path, push):")
+    for line_id in crb.forward(fact):
+        ans_id = crb.ans_ids[line_id]
+        fire = f"add({ans_id}); path.append({line_id}); push({ans_id})"
+        if crb.pre_counts[line_id] == 1:
+            # 单前提规则不需要计数
+            out.append(f"    if {ans_id} not in k: {fire}")
+        else:
+            out.append(f"    r[{line_id}] -= 1")
+            out.append(f"    if not r[{line_id}] and {ans_id} not in k: {fire}")
+    out.append("")
+
+
+def generate_source(crb: CompiledRuleBase) -> str:
+    """
+    生成求值模块源码，模块提供:
+    - PRE_COUNTS: 各规则的前提数，作为计数的初值
+    - HANDLERS: 事实id → 该事实成立时的处理函数（不参与规则的事实为 None）
+    - HAS_RULES: 参与规则的事实
+    - propagate(stack, r, known, path): 处理 stack 中的事实并传播到不动点
+    """
+    out = ['"""自动生成的规则库求值器，请勿手动修改"""', ""]
+    handlers: list[str] = []
+    for fact in range(crb.fact_count):
+        if crb.fwd_offsets[fact] == crb.fwd_offsets[fact + 1]:
+            handlers.append("None")
+            continue
+        _emit_handler(out, crb, fact)
+        handlers.append(f"_f{fact}")
+
+    out.append(f"PRE_COUNTS = {list(crb.pre_counts)!r}")
+    out.append(f"HANDLERS = ({', '.join(handlers)},)")
+    out.append("HAS_RULES = frozenset(f for f, h in enumerate(HANDLERS) if h is not None)")
+    out.append("")
+    out.append("def propagate(stack, r, known, path):")
+    out.append('    """')
+    out.append("    r 为各规则未满足的前提数（原地修改）；stack 中的事实互不相同，")
+    out.append("    推出的事实只在首次加入 known 时入栈，因此每个事实只处理一次")
+    out.append('    """')
+    out.append("    add, push, pop = known.add, stack.append, stack.pop")
+    out.append(f"    n = {crb.fact_count}")
+    out.append("    while stack:")
+    out.append("        f = pop()")
+    out.append("        h = HANDLERS[f] if f < n else None")
+    out.append("        if h is not None:")
+    out.append("            h(r, known, add, path, push)")
+    out.append("")
+    return "\n".join(out)
+
+
+class CompiledEvaluator:
+    """
+    生成模块的计数状态在多次 find 之间保留，只处理新增的已知事实，
+    一次断言只触及依赖新事实的规则；已知事实减少后调用 clear_memory 重新计数
+    """
+
+    def __init__(self, module: types.ModuleType) -> None:
+        self._module = module
+        self.has_rules: frozenset[int] = module.HAS_RULES
+        self.clear_memory()
+
+    def clear_memory(self) -> None:
+        self._counters = list(self._module.PRE_COUNTS)
+        self._processed: set[int] = set()  # 已处理过的已知事实，即上次求值结束时的闭包
+
+    def evaluate(self, known: set[int], path: list[int]) -> None:
+        """求 known 的闭包（原地修改），触发的规则依次追加到 path"""
+        stack = list(known - self._processed)
+        self._module.propagate(stack, self._counters, known, path)
+        self._processed = set(known)
+
+
+def _is_private(path: str) -> bool:
+    """
+    path 不是符号链接、属于当前用户且其他用户不可写
+    Windows 上没有 uid，依赖用户目录自身的访问权限
+    """
+    st = os.lstat(path)
+    if stat.S_ISLNK(st.st_mode):
+        return False
+    if not hasattr(os, "getuid"):
+        return True
+    return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def _read_private(path: str) -> Optional[bytes]:
+    """读取私有文件，文件不存在或可能被其他用户改动时返回 None"""
+    try:
+        if not _is_private(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """先写临时文件（权限 0600）再替换，避免并发进程读到写了一半的文件"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load_evaluator(key: str, build: Callable[[], str], cache_dir: str | None = None):
+    """
+    加载规则库求值模块，key 为 rules_hash 的结果
+    缓存未命中时调用 build() 生成源码；源码和编译后的字节码都缓存在磁盘上，
+    字节码文件名带解释器标签，不依赖 __pycache__ 是否可写。
+    缓存目录以 0700 创建，目录或缓存文件不属于当前用户、或其他用户可写时不使用；
+    源码首行记录规则库哈希，字节码文件头记录规则库哈希和源码的 SHA-256，不一致时重新生成。
+    缓存目录不安全时给出警告，只在内存中编译
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    module_name = f"rules_{key[:32]}"
+    source_path = os.path.join(cache_dir, module_name + ".py")
+    code_path = os.path.join(cache_dir, f"{module_name}.{sys.implementation.cache_tag}.bin")
+    header = f"# rules_hash: {key}\n".encode("utf-8")
+
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    use_cache = _is_private(cache_dir)
+    if not use_cache:
+        warnings.warn(f"代码生成缓存目录不安全（须属于当前用户且其他用户不可写），不使用缓存: {cache_dir}")
+
+    source = _read_private(source_path) if use_cache else None
+    if source is None or not source.startswith(header):
+        source = header + build().encode("utf-8")
+        if use_cache:
+            _write_atomic(source_path, source)
+
+    code = None
+    prefix = _CODE_MAGIC + key.encode("ascii") + hashlib.sha256(source).digest()
+    blob = _read_private(code_path) if use_cache else None
+    if blob is not None and blob.startswith(prefix):
+        try:
+            code = marshal.loads(blob[len(prefix) :])
+        except (EOFError, ValueError, TypeError):
+            code = None
+
+    if code is None:
+        code = compile(source, source_path, "exec")
+        if use_cache:
+            _write_atomic(code_path, prefix + marshal.dumps(code))
+
+    module = types.ModuleType(module_name)
+    module.__file__ = source_path
+    exec(code, module.__dict__)
+    return module
@@ -0,0 +1,98 @@
+"""
+编译后的只读规则库
+以 CSR（压缩稀疏行）形式把规则和双向邻接表存入连续的 array 缓冲区，
+替代每个事实一个 dict + 两个 list 的表示，大规模规则库下内存更省、访问更连续
+"""
+
+from array import array
+
+# 所有缓冲区统一使用 32 位有符号整数
+_TYPECODE = "i"
+
+
+def _csr(rows: list[list[int]]) -> tuple[array, array]:
+    """把二维列表压成 (offsets, values) 两个缓冲区"""
+    offsets = array(_TYPECODE, [0])
+    values = array(_TYPECODE)
+    for row in rows:
+        values.extend(row)
+        offsets.append(len(values))
+    return offsets, values
+
+
+class CompiledRuleBase:
+    """
+    不可变的 CSR 规则库
+    - pre_offsets / pre_ids: 规则 r 的前提为 pre_ids[pre_offsets[r]:pre_offsets[r + 1]]（已去重）
+    - pre_counts: 规则 r 的前提个数
+    - ans_ids: 规则 r 的结论
+    - fwd_offsets / fwd_lines: 事实 f 作为前提参与的规则（正向邻接，对应 anslines_id）
+    - rev_offsets / rev_lines: 能推出事实 f 的规则（反向邻接，对应 prelines_id）
+    """
+
+    __slots__ = (
+        "rule_count",
+        "fact_count",
+        "pre_offsets",
+        "pre_ids",
+        "pre_counts",
+        "ans_ids",
+        "fwd_offsets",
+        "fwd_lines",
+        "rev_offsets",
+        "rev_lines",
+    )
+
+    def __init__(self, lines_list: list[tuple[list[int], int]], fact_count: int) -> None:
+        """由 RuleReasoner 的 _lines_list 编译，fact_count 为事实总数"""
+        fwd: list[list[int]] = [[] for _ in range(fact_count)]
+        rev: list[list[int]] = [[] for _ in range(fact_count)]
+        premises: list[list[int]] = []
+
+        for line_id, (pres_id, ans_id) in enumerate(lines_list):
+            unique = list(dict.fromkeys(pres_id))
+            premises.append(unique)
+            for pre_id in unique:
+                fwd[pre_id].append(line_id)
+            rev[ans_id].append(line_id)
+
+        self.rule_count = len(lines_list)
+        self.fact_count = fact_count
+        self.pre_offsets, self.pre_ids = _csr(premises)
+        self.pre_counts = array(_TYPECODE, map(len, premises))
+        self.ans_ids = array(_TYPECODE, (ans_id for _, ans_id in lines_list))
+        self.fwd_offsets, self.fwd_lines = _csr(fwd)
+        self.rev_offsets, self.rev_lines = _csr(rev)
+
+    def premises(self, line_id: int) -> array:
+        """规则的前提id"""
+        return self.pre_ids[self.pre_offsets[line_id] : self.pre_offsets[line_id + 1]]
+
+    def forward(self, fact_id: int) -> array:
+        """以该事实为前提的规则id"""
+        if fact_id >= self.fact_count:
+            return array(_TYPECODE)
+        return self.fwd_lines[self.fwd_offsets[fact_id] : self.fwd_offsets[fact_id + 1]]
+
+    def reverse(self, fact_id: int) -> array:
+        """能推出该事实的规则id"""
+        if fact_id >= self.fact_count:
+            return array(_TYPECODE)
+        return self.rev_lines[self.rev_offsets[fact_id] : self.rev_offsets[fact_id + 1]]
+
+    @property
+    def nbytes(self) -> int:
+        """所有缓冲区占用的字节数"""
+        return sum(
+            buf.itemsize * len(buf)
+            for buf in (
+                self.pre_offsets,
+                self.pre_ids,
+                self.pre_counts,
+                self.ans_ids,
+                self.fwd_offsets,
+                self.fwd_lines,
+                self.rev_offsets,
+                self.rev_lines,
+            )
+        )
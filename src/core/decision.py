@@ -0,0 +1,163 @@
+"""
+反向推理目标的预编译决策树
+对每个目标预先求出询问原子事实的顺序：每个节点询问一个事实，按回答走向下一节点，直到目标确定。
+回答为真/假的概率均按 1/2 计，选择使期望提问数最小的事实；
+候选事实不多时精确求解，否则每步选排除候选规则最多的事实。
+编译可能很慢，可用预算限制；编译结果按规则库哈希在推理器之间共享（TreeCache）
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+from .budget import Budget
+from .compiled import CompiledRuleBase
+from .dependency import DependencyIndex
+from .questions import provable, question_plan
+
+# 叶子：目标成立 / 不成立
+PROVEN = -1
+REFUTED = -2
+
+# 候选事实不超过该数目时精确求解期望提问数最小的树
+_EXACT_LIMIT = 8
+# 状态数上限，超过即放弃编译
+_MAX_STATES = 20000
+# TreeCache 保留的规则库数
+_CACHED_RULE_BASES = 4
+
+
+class DecisionTree:
+    """
+    预编译的决策树，以表的形式保存
+    - nodes: 每项为 (询问的原子事实id, 为真时的下一节点, 为假时的下一节点)，下一节点为 PROVEN/REFUTED 时目标确定
+    - root: 根节点（目标无需提问即确定时为 PROVEN/REFUTED）
+    - expected_questions: 期望提问数
+    """
+
+    def __init__(
+        self,
+        crb: CompiledRuleBase,
+        deps: DependencyIndex,
+        goal: int,
+        budget: Optional[Budget] = None,
+    ) -> None:
+        """预算耗尽或状态数超出上限时抛出 ValueError"""
+        self.goal = goal
+        self.nodes: list[tuple[int, int, int]] = []
+        self._crb = crb
+        self._deps = deps
+        self._budget = budget
+        # 每个状态都要在目标依赖闭包上求一次"仍可能成立"集合，按闭包规则数记账
+        self._state_cost = max(len(deps.rules(goal)), 1)
+        # (为真的事实, 为假的事实) → (期望提问数, 询问的事实或叶子)
+        self._memo: dict[tuple[frozenset[int], frozenset[int]], tuple[float, int]] = {}
+
+        empty: frozenset[int] = frozenset()
+        self.expected_questions = self._solve(empty, empty)[0]
+        self.root = self._emit(empty, empty, {})
+        del self._memo
+        del self._budget
+
+    def _solve(self, true: frozenset[int], false: frozenset[int]) -> tuple[float, int]:
+        """求给定回答下的最优询问及期望提问数"""
+        key = (true, false)
+        if key in self._memo:
+            return self._memo[key]
+        if len(self._memo) >= _MAX_STATES:
+            raise ValueError("决策树规模超出上限，请使用逐步反向推理")
+        if self._budget is not None and self._budget.charge(checks=self._state_cost):
+            raise ValueError("决策树编译超出预算，请使用逐步反向推理")
+
+        crb, goal = self._crb, self.goal
+        possible = self._deps.possible_within(goal, set(true), set(false))
+        # 与 step_backward 一致：没有推导规则的目标不询问，直接判定为不成立
+        if goal not in possible or not self._deps.rules(goal):
+            result = (0.0, REFUTED)
+        elif provable(crb, goal, set(true), self._deps.subgraph(goal)):
+            result = (0.0, PROVEN)
+        else:
+            plan = question_plan(crb, self._deps, goal, set(true), set(false), possible)
+            if not plan:
+                # 没有可询问的事实能使目标成立
+                result = (0.0, REFUTED)
+            else:
+                candidates = [leaf for leaf, _ in plan]
+                if len(candidates) > _EXACT_LIMIT:
+                    candidates = candidates[:1]
+                best: Optional[tuple[float, int]] = None
+                for leaf in candidates:
+                    cost = 1.0 + 0.5 * (
+                        self._solve(true | {leaf}, false)[0] + self._solve(true, false | {leaf})[0]
+                    )
+                    if best is None or cost < best[0]:
+                        best = (cost, leaf)
+                result = best
+
+        self._memo[key] = result
+        return result
+
+    def _emit(self, true: frozenset[int], false: frozenset[int], emitted: dict) -> int:
+        """把求解结果写成节点表，相同的回答状态共用节点"""
+        key = (true, false)
+        if key in emitted:
+            return emitted[key]
+        leaf = self._memo[key][1]
+        if leaf < 0:
+            return leaf
+
+        index = len(self.nodes)
+        emitted[key] = index
+        self.nodes.append((leaf, PROVEN, REFUTED))
+        yes = self._emit(true | {leaf}, false, emitted)
+        no = self._emit(true, false | {leaf}, emitted)
+        self.nodes[index] = (leaf, yes, no)
+        return index
+
+    def walk(self, known: set[int], false: set[int]) -> int:
+        """
+        从根节点出发，已回答的事实直接走对应分支
+        返回 PROVEN/REFUTED，或需要询问的节点下标
+        """
+        node = self.root
+        while node >= 0:
+            fact, yes, no = self.nodes[node]
+            if fact in known:
+                node = yes
+            elif fact in false:
+                node = no
+            else:
+                return node
+        return node
+
+
+class TreeCache:
+    """
+    按规则库哈希共享的决策树缓存：规则库相同的推理器（如 Web 端的各个会话）共用编译结果
+    编译失败的目标记录失败原因，不再重复编译；只保留最近使用的若干个规则库
+    """
+
+    def __init__(self, max_rule_bases: int = _CACHED_RULE_BASES) -> None:
+        self._max_rule_bases = max_rule_bases
+        self._entries: OrderedDict[str, dict[str, Union[DecisionTree, str]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, rules_hash: str, target: str) -> Union[DecisionTree, str, None]:
+        """返回决策树、失败原因，或 None（尚未编译）"""
+        with self._lock:
+            trees = self._entries.get(rules_hash)
+            if trees is None:
+                return None
+            self._entries.move_to_end(rules_hash)
+            return trees.get(target)
+
+    def put(self, rules_hash: str, target: str, entry: Union[DecisionTree, str]) -> None:
+        with self._lock:
+            self._entries.setdefault(rules_hash, {})[target] = entry
+            self._entries.move_to_end(rules_hash)
+            while len(self._entries) > self._max_rule_bases:
+                self._entries.popitem(last=False)
+
+
+# 进程内共享的决策树缓存
+SHARED_TREES = TreeCache()
@@ -0,0 +1,134 @@
+"""
+目标依赖闭包索引
+对每个结论预先求出它可能依赖的原子事实（叶子）、规则和规则间的局部邻接表，每个规则库版本只计算一次；
+并在给定已知/假事实时求出"仍可能成立"的事实集合，供反向推理剪枝和可达目标查询使用
+"""
+
+from .compiled import CompiledRuleBase
+
+
+class Subgraph:
+    """
+    依赖闭包内的规则及其邻接表，在闭包内重算时不必扫描整个规则库
+    - premises: 规则id → 前提id
+    - forward: 事实id → 以它为前提的闭包内规则id
+    - producers: 事实id → 以它为结论的规则id（闭包内事实的推导规则都在闭包中）
+    """
+
+    def __init__(self, crb: CompiledRuleBase, rules: frozenset[int]) -> None:
+        self.premises: dict[int, tuple[int, ...]] = {}
+        self.forward: dict[int, list[int]] = {}
+        self.producers: dict[int, list[int]] = {}
+        for line_id in rules:
+            pres = tuple(crb.premises(line_id))
+            self.premises[line_id] = pres
+            for pre_id in pres:
+                self.forward.setdefault(pre_id, []).append(line_id)
+            self.producers.setdefault(crb.ans_ids[line_id], []).append(line_id)
+
+
+class DependencyIndex:
+    """基于 CSR 反向邻接表的依赖闭包索引，闭包按需计算并缓存"""
+
+    def __init__(self, crb: CompiledRuleBase) -> None:
+        self._crb = crb
+        self._leaves: dict[int, frozenset[int]] = {}
+        self._rules: dict[int, frozenset[int]] = {}
+        self._subgraphs: dict[int, Subgraph] = {}
+
+    def _closure(self, goal: int) -> None:
+        """沿反向邻接表遍历 goal 能依赖的所有规则和叶子事实"""
+        crb = self._crb
+        rules: set[int] = set()
+        leaves: set[int] = set()
+        seen = {goal}
+        stack = [goal]
+
+        while stack:
+            fact = stack.pop()
+            if fact >= crb.fact_count:
+                leaves.add(fact)
+                continue
+            begin, end = crb.rev_offsets[fact], crb.rev_offsets[fact + 1]
+            if begin == end:
+                leaves.add(fact)
+                continue
+            for line_id in crb.rev_lines[begin:end]:
+                rules.add(line_id)
+                for pre_id in crb.premises(line_id):
+                    if pre_id not in seen:
+                        seen.add(pre_id)
+                        stack.append(pre_id)
+
+        self._leaves[goal] = frozenset(leaves)
+        self._rules[goal] = frozenset(rules)
+
+    def leaves(self, goal: int) -> frozenset[int]:
+        """goal 可能依赖的原子事实（没有推导规则的事实）"""
+        if goal not in self._leaves:
+            self._closure(goal)
+        return self._leaves[goal]
+
+    def rules(self, goal: int) -> frozenset[int]:
+        """goal 可能依赖的规则"""
+        if goal not in self._rules:
+            self._closure(goal)
+        return self._rules[goal]
+
+    def subgraph(self, goal: int) -> "Subgraph":
+        """goal 依赖闭包内的局部邻接表"""
+        if goal not in self._subgraphs:
+            self._subgraphs[goal] = Subgraph(self._crb, self.rules(goal))
+        return self._subgraphs[goal]
+
+    def possible_within(self, goal: int, known_set: set[int], false_set: set[int]) -> set[int]:
+        """
+        只在 goal 的依赖闭包内求 possible：闭包内事实的结果与 possible 相同，
+        闭包外只包含已知事实；代价与闭包大小成正比，与整个规则库无关
+        """
+        crb = self._crb
+        sub = self.subgraph(goal)
+        remaining = {line_id: len(pres) for line_id, pres in sub.premises.items()}
+        result = set(known_set) | (self.leaves(goal) - false_set)
+
+        stack = list(result)
+        while stack:
+            fact = stack.pop()
+            for line_id in sub.forward.get(fact, ()):
+                remaining[line_id] -= 1
+                if remaining[line_id]:
+                    continue
+                ans_id = crb.ans_ids[line_id]
+                if ans_id not in result and ans_id not in false_set:
+                    result.add(ans_id)
+                    stack.append(ans_id)
+
+        return result
+
+    def possible(self, known_set: set[int], false_set: set[int]) -> set[int]:
+        """
+        仍可能成立的事实集合（最小不动点）
+        已知事实和未被否定的叶子可能成立；规则前提全部可能成立时，其结论（未被否定）可能成立
+        不在集合中的目标，其每条支持路径都会遇到已知为假的事实
+        """
+        crb = self._crb
+        remaining = crb.pre_counts[:]
+        result = set(known_set)
+        for fact in range(crb.fact_count):
+            if crb.rev_offsets[fact] == crb.rev_offsets[fact + 1] and fact not in false_set:
+                result.add(fact)
+
+        stack = [f for f in result if f < crb.fact_count]
+        while stack:
+            fact = stack.pop()
+            for i in range(crb.fwd_offsets[fact], crb.fwd_offsets[fact + 1]):
+                line_id = crb.fwd_lines[i]
+                remaining[line_id] -= 1
+                if remaining[line_id]:
+                    continue
+                ans_id = crb.ans_ids[line_id]
+                if ans_id not in result and ans_id not in false_set:
+                    result.add(ans_id)
+                    stack.append(ans_id)
+
+        return result
@@ -0,0 +1,120 @@
+"""
+反向推理的代价规划
+为每个事实估计证明代价（需要询问的原子事实数）和成立概率：
+- 原子事实代价为 1，成立概率取自历史回答频率，没有历史时为 1/2
+- 规则代价为 1 + 各前提代价之和，成立概率为各前提成立概率之积
+- 事实代价为各规则代价的最小值（按 Knuth 的广义 Dijkstra 算法求出），成立概率为至少一条规则成立的概率
+规则按 代价 / 成立概率 从小到大尝试；规则内的前提按 代价 / 不成立概率 从小到大检查，
+便宜且容易被否定的前提先检查
+"""
+
+import heapq
+import math
+from typing import Optional
+
+from .compiled import CompiledRuleBase
+
+# 概率下限，避免除以 0
+_EPSILON = 1e-6
+
+
+def answer_frequencies(history: list[dict]) -> tuple[dict[str, float], float]:
+    """
+    由推理历史估计原子事实被回答为真的频率（拉普拉斯平滑）
+    历史记录的 facts 为用户确认为真的事实；返回值见 frequencies_from_counts
+    """
+    counts: dict[str, int] = {}
+    for record in history:
+        for fact in set(record.get("facts", [])):
+            counts[fact] = counts.get(fact, 0) + 1
+    return frequencies_from_counts(counts, len(history))
+
+
+def frequencies_from_counts(counts: dict[str, int], total: int) -> tuple[dict[str, float], float]:
+    """
+    由 事实 → 确认为真的记录数 和记录总数估计频率（拉普拉斯平滑）
+    返回 (事实 → 频率, 未出现在历史中的事实的频率)；后者为 1/(total+2)，没有历史时为 1/2
+    """
+    frequencies = {fact: (count + 1) / (total + 2) for fact, count in counts.items()}
+    return frequencies, 1 / (total + 2)
+
+
+class BackwardPlanner:
+    """规则库的静态代价估计，规则和前提的顺序按需计算并缓存"""
+
+    def __init__(
+        self,
+        crb: CompiledRuleBase,
+        p_true: Optional[dict[int, float]] = None,
+        default_p: float = 0.5,
+    ) -> None:
+        """p_true 中没有的原子事实，成立概率取 default_p"""
+        self._crb = crb
+        p_true = p_true or {}
+        n = crb.fact_count
+        self.cost: list[float] = [math.inf] * n
+        self.p_true: list[float] = [0.0] * n
+        self._rule_orders: dict[int, list[int]] = {}
+        self._premise_orders: dict[int, list[int]] = {}
+
+        # 广义 Dijkstra：规则的前提全部确定后，其结论的代价才可能被更新
+        remaining = crb.pre_counts[:]
+        rule_cost = [math.inf] * crb.rule_count
+        heap: list[tuple[float, int]] = []
+        for fact in range(n):
+            if crb.rev_offsets[fact] == crb.rev_offsets[fact + 1]:
+                self.cost[fact] = 1.0
+                heap.append((1.0, fact))
+        heapq.heapify(heap)
+
+        order: list[int] = []  # 事实确定代价的顺序
+        done = [False] * n
+        while heap:
+            cost, fact = heapq.heappop(heap)
+            if done[fact]:
+                continue
+            done[fact] = True
+            order.append(fact)
+            for line_id in crb.forward(fact):
+                remaining[line_id] -= 1
+                if remaining[line_id]:
+                    continue
+                rule_cost[line_id] = 1.0 + sum(self.cost[p] for p in crb.premises(line_id))
+                ans_id = crb.ans_ids[line_id]
+                if rule_cost[line_id] < self.cost[ans_id]:
+                    self.cost[ans_id] = rule_cost[line_id]
+                    heapq.heappush(heap, (rule_cost[line_id], ans_id))
+
+        # 按确定顺序求成立概率，只使用前提都更早确定的规则，保证无环
+        self._rule_p = [0.0] * crb.rule_count
+        position = {fact: i for i, fact in enumerate(order)}
+        for fact in order:
+            if crb.rev_offsets[fact] == crb.rev_offsets[fact + 1]:
+                self.p_true[fact] = p_true.get(fact, default_p)
+                continue
+            p_none = 1.0
+            for line_id in crb.reverse(fact):
+                pres = crb.premises(line_id)
+                if all(position.get(p, math.inf) < position[fact] for p in pres):
+                    self._rule_p[line_id] = math.prod(self.p_true[p] for p in pres)
+                    p_none *= 1.0 - self._rule_p[line_id]
+            self.p_true[fact] = 1.0 - p_none
+        self._rule_cost = rule_cost
+
+    def rule_order(self, fact: int) -> list[int]:
+        """推出 fact 的规则，按 代价 / 成立概率 从小到大"""
+        if fact not in self._rule_orders:
+            self._rule_orders[fact] = sorted(
+                self._crb.reverse(fact),
+                key=lambda r: (self._rule_cost[r] / max(self._rule_p[r], _EPSILON), r),
+            )
+        return self._rule_orders[fact]
+
+    def premise_order(self, line_id: int) -> list[int]:
+        """规则的前提，按 代价 / 不成立概率 从小到大"""
+        if line_id not in self._premise_orders:
+            self._premise_orders[line_id] = sorted(
+                self._crb.premises(line_id),
+                key=lambda p: (self.cost[p] / max(1.0 - self.p_true[p], _EPSILON), p),
+            )
+        return self._premise_orders[line_id]
@@ -0,0 +1,63 @@
+"""
+可序列化的反向推理状态
+证明过程的全部状态（推理栈、已知事实、假事实、路径）都保存在 BackwardProof 中，
+推理器只提供规则库；状态可转为 JSON 保存在进程外，由任何加载了同一规则库的推理器继续
+"""
+
+from typing import Optional
+
+
+class BackwardProof:
+    """
+    反向推理状态机的状态
+    - frames: 推理栈，每帧为 [事实名字, 规则下标, 前提位置, 依赖的祖先位置]，前提位置之前的前提均已成立，
+      继续时不再检查；因子目标成环跳过过规则时记录所依赖的最深祖先在栈中的位置，否则为 None
+    - known / false: 已知为真 / 为假的事实名字
+    - path: 已得证所用的规则id
+    - status: None 表示尚未结束，0 成功，1 失败
+    - order: 规则和前提的尝试顺序，"stored"（规则库中的顺序）或 "cost:<回答频率指纹>"；帧中的下标按该顺序解释
+    """
+
+    def __init__(
+        self,
+        target: str,
+        rules_hash: str,
+        known: Optional[list[str]] = None,
+        false: Optional[list[str]] = None,
+        order: str = "stored",
+    ) -> None:
+        self.target = target
+        self.rules_hash = rules_hash
+        self.order = order
+        self.frames: list[list] = [[target, 0, 0, None]]
+        self.known: list[str] = list(known or [])
+        self.false: list[str] = list(false or [])
+        self.path: list[int] = []
+        self.status: Optional[int] = None
+        # 仍可能成立的事实集合，只在本进程内缓存，不参与序列化
+        self._possible: Optional[set[int]] = None
+
+    def to_dict(self) -> dict:
+        """转为可 JSON 序列化的字典"""
+        return {
+            "target": self.target,
+            "rules_hash": self.rules_hash,
+            "order": self.order,
+            "frames": [list(frame) for frame in self.frames],
+            "known": list(self.known),
+            "false": list(self.false),
+            "path": list(self.path),
+            "status": self.status,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BackwardProof":
+        """从 to_dict 的结果恢复"""
+        proof = cls(
+            data["target"], data["rules_hash"], data["known"], data["false"], data.get("order", "stored")
+        )
+        # 旧版本保存的帧没有祖先位置
+        proof.frames = [list(frame) + [None] * (4 - len(frame)) for frame in data["frames"]]
+        proof.path = list(data["path"])
+        proof.status = data["status"]
+        return proof
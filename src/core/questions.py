@@ -0,0 +1,155 @@
+"""
+反向推理的一次性提问计划
+目标依赖闭包中前提全部仍可能成立的规则是候选的证明步骤；某个可询问的原子事实为假时，
+会使一部分候选规则不再可能成立（使目标不可能成立时视为排除全部候选规则）。
+每个事实只在它于目标依赖闭包内的正向锥上增量重算，不扫描整个规则库。
+按排除的候选规则数从多到少排列问题，客户端可一次回答多个问题
+"""
+
+from typing import Optional
+
+from .budget import Budget
+from .compiled import CompiledRuleBase
+from .dependency import DependencyIndex, Subgraph
+
+
+def provable(
+    crb: CompiledRuleBase, goal: int, known: set[int], sub: Optional[Subgraph] = None
+) -> bool:
+    """
+    goal 是否在 known 的闭包中（计数式正向推理，只为触及的规则计数）
+    sub 为 goal 的依赖闭包时只沿闭包内的规则推理，目标的推导只会用到这些规则
+    """
+    if goal in known:
+        return True
+    pre_counts = crb.pre_counts
+    remaining: dict[int, int] = {}
+    closure = set(known)
+    stack = [f for f in known if f < crb.fact_count]
+    while stack:
+        fact = stack.pop()
+        if sub is not None:
+            lines = sub.forward.get(fact, ())
+        else:
+            lines = crb.fwd_lines[crb.fwd_offsets[fact] : crb.fwd_offsets[fact + 1]]
+        for line_id in lines:
+            count = remaining.get(line_id, pre_counts[line_id]) - 1
+            remaining[line_id] = count
+            if count:
+                continue
+            ans_id = crb.ans_ids[line_id]
+            if ans_id == goal:
+                return True
+            if ans_id not in closure:
+                closure.add(ans_id)
+                stack.append(ans_id)
+    return False
+
+
+def _lost_facts(
+    crb: CompiledRuleBase,
+    sub: Subgraph,
+    leaf: int,
+    known: set[int],
+    possible: set[int],
+    budget: Optional[Budget],
+) -> Optional[set[int]]:
+    """
+    leaf 为假时不再可能成立的事实；预算耗尽时返回 None
+    只有 leaf 在闭包内的正向锥（仍可能成立的未知结论）会变化，锥外事实保持 possible 中的状态，
+    因此只在锥上重求最小不动点
+    """
+    cone = {leaf}
+    stack = [leaf]
+    while stack:
+        fact = stack.pop()
+        for line_id in sub.forward.get(fact, ()):
+            ans_id = crb.ans_ids[line_id]
+            if ans_id not in cone and ans_id in possible and ans_id not in known:
+                cone.add(ans_id)
+                stack.append(ans_id)
+    if budget is not None and budget.charge(checks=len(cone)):
+        return None
+
+    # 锥内规则尚未满足的锥内前提数；有锥外前提不可能成立的规则不会再满足
+    remaining: dict[int, int] = {}
+    revived: set[int] = set()
+    for fact in cone:
+        for line_id in sub.producers.get(fact, ()):
+            count = 0
+            for pre_id in sub.premises[line_id]:
+                if pre_id in cone:
+                    count += 1
+                elif pre_id not in possible:
+                    break
+            else:
+                if count:
+                    remaining[line_id] = count
+                else:
+                    revived.add(fact)
+
+    stack = list(revived)
+    while stack:
+        fact = stack.pop()
+        for line_id in sub.forward.get(fact, ()):
+            if line_id not in remaining:
+                continue
+            remaining[line_id] -= 1
+            ans_id = crb.ans_ids[line_id]
+            if not remaining[line_id] and ans_id not in revived:
+                revived.add(ans_id)
+                stack.append(ans_id)
+
+    return cone - revived
+
+
+def question_plan(
+    crb: CompiledRuleBase,
+    deps: DependencyIndex,
+    goal: int,
+    known: set[int],
+    false: set[int],
+    possible: set[int],
+    budget: Optional[Budget] = None,
+) -> list[tuple[int, int]]:
+    """
+    返回 [(原子事实id, 该事实为假时排除的候选规则数)]，按排除数从多到少排列，相同时按id
+    只包含出现在候选规则中的未知原子事实，这些事实之外的回答不会影响结果；
+    目标已确定（已知、不可能成立或已可由已知事实推出）时返回空列表
+    possible 为 deps.possible(known, false)；预算耗尽时只包含已评估的事实并置 budget.exhausted
+    """
+    sub = deps.subgraph(goal)
+    if goal in known or goal not in possible or provable(crb, goal, known, sub):
+        return []
+
+    leaves = deps.leaves(goal)
+    live = {
+        line_id
+        for line_id, pres in sub.premises.items()
+        if all(pre_id in possible for pre_id in pres)
+    }
+    asked = sorted(
+        {
+            pre_id
+            for line_id in live
+            for pre_id in sub.premises[line_id]
+            if pre_id not in known and pre_id in leaves
+        }
+    )
+
+    plan = []
+    for leaf in asked:
+        lost = _lost_facts(crb, sub, leaf, known, possible, budget)
+        if lost is None:
+            break
+        if goal in lost:
+            # 该事实为假即可否定目标，排除全部候选规则
+            eliminated = len(live)
+        else:
+            eliminated = len(
+                {line_id for fact in lost for line_id in sub.forward.get(fact, ())} & live
+            )
+        plan.append((leaf, eliminated))
+
+    plan.sort(key=lambda item: (-item[1], item[0]))
+    return plan
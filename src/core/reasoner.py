@@ -3,14 +3,50 @@
 支持正向推理和反向推理
 """
 
+import hashlib
+import heapq
+import json
 from typing import Optional
 
+from . import codegen
+from .agenda import Agenda
+from .batch import BatchEvaluator, _require_numpy
+from .bitset import BitsetRuleBase, bits_to_ids, ids_to_bits
+from .budget import Budget
+from .compiled import CompiledRuleBase
+from .decision import PROVEN, REFUTED, SHARED_TREES, DecisionTree
+from .dependency import DependencyIndex
+from .planner import BackwardPlanner
+from .proof import BackwardProof
+from .questions import question_plan
+from .rete import ReteNetwork
+from .topology import EvaluationPlan
+from .watch import WatchIndex
+
+# 可选的正向推理引擎
+ENGINES: tuple[str, ...] = ("stack", "counter", "rete", "csr", "bitset", "topo", "codegen", "watched")
+# 反向推理中规则和前提的尝试顺序：stored 按规则库中的顺序，cost 按代价规划
+BACKWARD_ORDERS: tuple[str, ...] = ("stored", "cost")
+
 
 class RuleReasoner:
     """推理器类"""
 
-    def __init__(self) -> None:
-        """构造后需通过 reset 提供规则"""
+    def __init__(
+        self,
+        engine: str = "stack",
+        codegen_dir: Optional[str] = None,
+        backward_order: str = "stored",
+    ) -> None:
+        """
+        构造后需通过 reset 提供规则，engine 指定正向推理引擎
+        codegen_dir 为 engine="codegen" 时生成模块的缓存目录，默认位于当前用户的缓存目录
+        backward_order 指定反向推理中规则和前提的尝试顺序，见 BACKWARD_ORDERS
+        """
+        self.engine = engine
+        self.codegen_dir = codegen_dir
+        self._order_stamp: int = 0  # 反向推理顺序变化的次数
+        self.backward_order = backward_order
         self._lines_list: list[tuple[list[int], int]] = (
             []
         )  # 储存所有规则 (前提id列表, 结论id)
@@ -22,12 +58,51 @@ class RuleReasoner:
         self._known_set: set[int] = set()  # 已知信息集合
         self._reasoner_path: list[int] = []  # 推理路径，储存经过的line_id
         self._reasoner_set: set[int] = set()  # 经过的line_id集合
+        self._support: dict[int, int] = {}  # 真值维护：推导出的事实 → 支持它的line_id
 
         # 反向推理状态
-        self._bw_stack: list[dict] = []  # 反向推理栈 [{u: int, rule_idx: int}]
+        # 反向推理栈 [{u: int, rule_idx: int, low?: int}]，low 见 _backward_events
+        self._bw_stack: list[dict] = []
         self._false_set: set[int] = set()  # 已知为假的事实
         self._in_backward: int = -1  # 当前反向推理目标
 
+        # 反向推理表：子目标 → 第一条尚未被否定的规则下标，跨目标复用
+        # 规则被否定只取决于 _false_set，因此表只在规则库变化或假事实减少时失效
+        self._version: int = 0  # 规则库版本，每次 reset 加一
+        self._false_epoch: int = 0  # 假事实减少的次数
+        self._bw_table: dict[int, int] = {}
+        self._bw_table_key: tuple[int, int, int] = (0, 0, 0)
+        # 多目标反向推理中各目标的 (推理栈, 当前目标, 表版本)
+        self._multi_stacks: dict[int, tuple[list[dict], int, tuple[int, int, int]]] = {}
+
+        # 目标依赖闭包索引（按需构建），以及"仍可能成立"事实集合的缓存
+        # 反向推理自行判定失败的子目标本就不可能成立，只有外部添加假事实才会使缓存失效
+        self._known_epoch: int = 0  # 已知事实减少的次数
+        self._false_stamp: int = 0  # 外部添加假事实的次数
+        self._deps: Optional[DependencyIndex] = None
+        self._possible_cache: tuple[tuple, set[int]] = ((), set())
+
+        # Rete 匹配网络（engine="rete" 时按需构建）
+        self._rete: Optional[ReteNetwork] = None
+        # 监视前提索引（engine="watched" 时按需构建）
+        self._watch: Optional[WatchIndex] = None
+        # CSR 编译规则库（compile() 按需构建）
+        self._compiled: Optional[CompiledRuleBase] = None
+        # 强连通分量拓扑序求值计划（按需构建）
+        self._plan: Optional[EvaluationPlan] = None
+        # 代码生成的规则库求值器（engine="codegen" 时按需加载），计数状态在多次 find 间保留
+        self._codegen: Optional[codegen.CompiledEvaluator] = None
+        # 规则库内容哈希（rules_hash() 按需计算）
+        self._hash: Optional[str] = None
+        # 反向推理代价规划（backward_order="cost" 时按需构建），以及原子事实为真的频率和默认频率
+        self._planner: Optional[BackwardPlanner] = None
+        self._answer_freq: dict[str, float] = {}
+        self._answer_default = 0.5
+        # 规则前提掩码（engine="bitset" 时按需构建）
+        self._bitset: Optional[BitsetRuleBase] = None
+        # 批量推理求解器（find_batch 按需构建）
+        self._batch: Optional[BatchEvaluator] = None
+
     def _get_line_id(self, pres_id: list[int], ans_id: int) -> int:
         """插入规则并获得id"""
         self._lines_list.append((pres_id, ans_id))
@@ -68,9 +143,23 @@ class RuleReasoner:
         self._known_set.clear()
         self._reasoner_path.clear()
         self._reasoner_set.clear()
+        self._support.clear()
         self._false_set.clear()
         self._bw_stack.clear()
         self._in_backward = -1
+        self._version += 1
+        self._bw_table.clear()
+        self._multi_stacks.clear()
+        self._rete = None
+        self._watch = None
+        self._deps = None
+        self._compiled = None
+        self._plan = None
+        self._codegen = None
+        self._hash = None
+        self._planner = None
+        self._bitset = None
+        self._batch = None
 
         for pres, ans in rules:
             self._add_rule(pres, ans)
@@ -78,24 +167,356 @@ class RuleReasoner:
     def add_known(self, known: list[str]) -> None:
         """添加已知信息"""
         for k in known:
-            self._known_set.add(self._get_name_id(k))
+            node_id = self._get_name_id(k)
+            self._known_set.add(node_id)
+            # 用户直接断言的事实不再依赖推导支持
+            self._support.pop(node_id, None)
+
+    def add_derived(self, path: list[int]) -> None:
+        """
+        把规则路径中各规则的结论作为推导事实加入已知信息，并记录支持规则
+        用于在推理器之外执行的推理（如 resume_proof 返回的路径），撤回时与其他推导事实一致
+        """
+        for line_id in path:
+            ans_id = self._lines_list[line_id][1]
+            if ans_id not in self._known_set:
+                self._known_set.add(ans_id)
+                self._support[ans_id] = line_id
 
     def clear_known(self) -> None:
         """清空已知信息"""
         self._known_set.clear()
+        self._known_epoch += 1
+        self._reasoner_path.clear()
+        self._support.clear()
+        if self._rete is not None:
+            self._rete.clear_memory()
+        if self._watch is not None:
+            self._watch.clear_memory()
+        if self._codegen is not None:
+            self._codegen.clear_memory()
+
+    def retract(self, facts: list[str]) -> tuple[list[str], list[int]]:
+        """
+        撤回已知事实，只移除失去全部支持的推导事实
+        先删除支持规则依赖被撤回事实的推导事实（传递），再尝试用其他规则重新推导被删除的事实
+        代价只与受影响的子图大小有关
+        返回: (被移除的事实名字列表, 重新推导所用的规则id列表)
+        """
+        retracted = [
+            self._name_id_map[f]
+            for f in facts
+            if f in self._name_id_map and self._name_id_map[f] in self._known_set
+        ]
+
+        self._known_epoch += 1
+
+        # 过删除：支持规则以被删除事实为前提的推导事实一并删除
+        deleted = set(retracted)
+        stack = list(retracted)
+        while stack:
+            now_id = stack.pop()
+            self._known_set.discard(now_id)
+            self._support.pop(now_id, None)
+            for line_id in self._node_list[now_id]["anslines_id"]:
+                ans_id = self._lines_list[line_id][1]
+                if self._support.get(ans_id) == line_id and ans_id not in deleted:
+                    deleted.add(ans_id)
+                    stack.append(ans_id)
+
+        if self._rete is not None:
+            self._rete.retract_facts(deleted)
+        if self._watch is not None:
+            self._watch.clear_memory()
+        if self._codegen is not None:
+            self._codegen.clear_memory()
+
+        # 重新推导：被删除的事实若仍有前提全部成立的规则，则以该规则为新的支持恢复
+        rederived: list[int] = []
+        stack = list(deleted)
+        while stack:
+            now_id = stack.pop()
+            if now_id in self._known_set:
+                continue
+            for line_id in self._node_list[now_id]["prelines_id"]:
+                pres_id = self._lines_list[line_id][0]
+                if pres_id and all(pre_id in self._known_set for pre_id in pres_id):
+                    self._known_set.add(now_id)
+                    self._support[now_id] = line_id
+                    rederived.append(line_id)
+                    for next_line in self._node_list[now_id]["anslines_id"]:
+                        ans_id = self._lines_list[next_line][1]
+                        if ans_id in deleted and ans_id not in self._known_set:
+                            stack.append(ans_id)
+                    break
+
+        removed = [self._get_id_name(i) for i in deleted if i not in self._known_set]
+        return removed, rederived
+
+    def snapshot(self) -> tuple[int, int]:
+        """以位集合形式保存 (已知事实, 已知为假) 快照，结果不可变，可直接保存和比较"""
+        return ids_to_bits(self._known_set), ids_to_bits(self._false_set)
+
+    def restore(self, snapshot: tuple[int, int]) -> None:
+        """恢复 snapshot 保存的事实状态"""
+        known_bits, false_bits = snapshot
+        self._known_set = set(bits_to_ids(known_bits))
+        self._false_set = set(bits_to_ids(false_bits))
+        self._known_epoch += 1
+        self._false_epoch += 1
         self._reasoner_path.clear()
+        self._support = {
+            fact: line_id
+            for fact, line_id in self._support.items()
+            if fact in self._known_set
+            and all(pre_id in self._known_set for pre_id in self._lines_list[line_id][0])
+        }
+        if self._rete is not None:
+            self._rete.clear_memory()
+        if self._watch is not None:
+            self._watch.clear_memory()
+        if self._codegen is not None:
+            self._codegen.clear_memory()
 
     def add_false(self, falses: list[str]) -> None:
         """添加反例信息"""
         for f in falses:
             self._false_set.add(self._get_name_id(f))
+        self._false_stamp += 1
 
     def clear_false(self) -> None:
         """清空反例信息"""
         self._false_set.clear()
+        self._false_epoch += 1
+
+    @property
+    def engine(self) -> str:
+        """当前正向推理引擎"""
+        return self._engine
+
+    @engine.setter
+    def engine(self, engine: str) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"未知的推理引擎: {engine}，可选: {', '.join(ENGINES)}")
+        self._engine = engine
+
+    @property
+    def backward_order(self) -> str:
+        """反向推理中规则和前提的尝试顺序"""
+        return self._backward_order
+
+    @backward_order.setter
+    def backward_order(self, order: str) -> None:
+        if order not in BACKWARD_ORDERS:
+            raise ValueError(f"未知的反向推理顺序: {order}，可选: {', '.join(BACKWARD_ORDERS)}")
+        self._backward_order = order
+        self._order_stamp += 1
+
+    def set_answer_frequencies(self, frequencies: dict[str, float], default: float = 0.5) -> None:
+        """
+        设置原子事实被回答为真的频率（可由 planner.answer_frequencies 从推理历史得到），
+        backward_order="cost" 时用于估计前提的成立概率；frequencies 中没有的原子事实取 default
+        """
+        self._answer_freq = dict(frequencies)
+        self._answer_default = default
+        self._planner = None
+        self._order_stamp += 1
+
+    def _backward_planner(self) -> BackwardPlanner:
+        """获取当前规则库版本的反向推理代价规划"""
+        if self._planner is None:
+            p_true = {
+                self._name_id_map[name]: p
+                for name, p in self._answer_freq.items()
+                if name in self._name_id_map
+            }
+            self._planner = BackwardPlanner(self.compile(), p_true, self._answer_default)
+        return self._planner
 
-    def find(self) -> tuple[list[str], list[int]]:
-        """开始正向推理，返回 (结论名字列表, 规则id路径)"""
+    def find(
+        self,
+        targets: Optional[list[str]] = None,
+        stop_on_first: bool = False,
+        budget: Optional[Budget] = None,
+    ) -> tuple[list[str], list[int]]:
+        """
+        开始正向推理，返回 (结论名字列表, 规则id路径)
+        指定 targets 时只触发能推出某个目标的规则，结论为已成立的目标；
+        stop_on_first 为真时推出第一个目标即停止
+        指定 budget 时使用计数式推理，预算耗尽则返回部分结果并置 budget.exhausted，
+        已推出的事实保留在已知事实中，再次调用从这里继续
+        """
+        if targets is not None:
+            result, path = self._find_targets(targets, stop_on_first, budget)
+        elif budget is not None or self._engine == "counter":
+            result, path = self._find_counter(budget)
+        elif self._engine == "rete":
+            result, path = self._find_rete()
+        elif self._engine == "csr":
+            result, path = self._find_csr()
+        elif self._engine == "bitset":
+            result, path = self._find_bitset()
+        elif self._engine == "topo":
+            result, path = self._find_topo()
+        elif self._engine == "codegen":
+            result, path = self._find_codegen()
+        elif self._engine == "watched":
+            result, path = self._find_watched()
+        else:
+            result, path = self._find_stack()
+        self._record_support(path)
+        return result, path
+
+    def _find_targets(
+        self, targets: list[str], stop_on_first: bool, budget: Optional[Budget] = None
+    ) -> tuple[list[str], list[int]]:
+        """
+        目标导向的计数式正向推理
+        沿反向邻接表求出能到达目标的规则，只对这些规则计数，其余规则不触发
+        """
+        self._reasoner_path.clear()
+        target_ids = {self._name_id_map[t]: t for t in targets if t in self._name_id_map}
+        result = [name for node_id, name in target_ids.items() if node_id in self._known_set]
+        if not target_ids or (stop_on_first and result):
+            return result[:1] if stop_on_first else result, []
+
+        crb = self.compile()
+        deps = self._dependency_index()
+        relevant: set[int] = set()
+        for node_id in target_ids:
+            relevant |= deps.rules(node_id)
+
+        fwd_offsets, fwd_lines, ans_ids = crb.fwd_offsets, crb.fwd_lines, crb.ans_ids
+        remaining = crb.pre_counts[:]
+        stack = [node_id for node_id in self._known_set if node_id < crb.fact_count]
+
+        while stack:
+            now_id = stack.pop()
+            for line_id in fwd_lines[fwd_offsets[now_id] : fwd_offsets[now_id + 1]]:
+                if line_id not in relevant:
+                    continue
+                if budget is not None and budget.charge(checks=1):
+                    return result, self._reasoner_path.copy()
+                remaining[line_id] -= 1
+                if remaining[line_id]:
+                    continue
+
+                ans_id = ans_ids[line_id]
+                if ans_id in self._known_set:
+                    continue
+                if budget is not None and budget.charge(rules=1):
+                    return result, self._reasoner_path.copy()
+
+                self._reasoner_path.append(line_id)
+                self._known_set.add(ans_id)
+                if ans_id in target_ids:
+                    result.append(target_ids[ans_id])
+                    if stop_on_first:
+                        return result, self._reasoner_path.copy()
+                stack.append(ans_id)
+
+        return result, self._reasoner_path.copy()
+
+    def find_agenda(
+        self,
+        strategy: str = "order",
+        salience: Optional[list[float]] = None,
+        stop_on_terminal: bool = True,
+        budget: Optional[Budget] = None,
+    ) -> tuple[list[str], list[int]]:
+        """
+        基于议程的正向推理，冲突消解策略见 agenda.STRATEGIES
+        salience 为每条规则的显著度（按规则id），仅 strategy="salience" 时使用
+        每次触发议程中优先级最高的规则；stop_on_terminal 为真时触发第一条结论为终点事实的规则后停止
+        返回 (结论名字列表, 规则id路径)，结论先按触发顺序列出推出的终点事实，
+        其后是调用前已成立的终点事实，因此结论[0]即为优先级最高的结论
+        预算耗尽时停止触发并置 budget.exhausted
+        """
+        agenda = Agenda(strategy, self._lines_list, salience)
+        self._reasoner_path.clear()
+
+        remaining = [len(pres_id) for pres_id, _ in self._lines_list]
+        stamp: dict[int, int] = dict.fromkeys(self._known_set, 0)  # 事实成立的时间戳
+        derived: list[str] = []
+
+        def activate(node_id: int) -> None:
+            for line_id in self._node_list[node_id]["anslines_id"]:
+                remaining[line_id] -= 1
+                if not remaining[line_id]:
+                    pres_id = self._lines_list[line_id][0]
+                    agenda.push(line_id, max(stamp[pre_id] for pre_id in pres_id))
+
+        for node_id in sorted(self._known_set):
+            activate(node_id)
+
+        while agenda:
+            line_id = agenda.pop()
+            ans_id = self._lines_list[line_id][1]
+            if ans_id in self._known_set:
+                continue
+            pres_count = len(self._lines_list[line_id][0])
+            if budget is not None and budget.charge(rules=1, checks=pres_count):
+                break
+
+            self._reasoner_path.append(line_id)
+            self._known_set.add(ans_id)
+            stamp[ans_id] = len(self._reasoner_path)
+            if not self._node_list[ans_id]["anslines_id"]:
+                derived.append(self._get_id_name(ans_id))
+                if stop_on_terminal:
+                    break
+            activate(ans_id)
+
+        given = [
+            self._get_id_name(node_id)
+            for node_id in sorted(self._known_set)
+            if stamp.get(node_id) == 0 and not self._node_list[node_id]["anslines_id"]
+        ]
+        path = self._reasoner_path.copy()
+        self._record_support(path)
+        return derived + given, path
+
+    def iter_find(self):
+        """
+        逐步产出正向推理事件的生成器（计数式推理），事件为元组:
+        - ("rule", 规则id, 事实名字): 规则触发，推出事实
+        - ("conclusion", 事实名字): 到达终点事实
+        调用方可随时停止迭代，已推出的事实保留在已知事实中
+        """
+        self._reasoner_path.clear()
+        remaining = [len(pres_id) for pres_id, _ in self._lines_list]
+        stack = list(self._known_set)
+
+        while stack:
+            now_id = stack.pop()
+            now_node = self._node_list[now_id]
+
+            if not now_node["anslines_id"]:
+                yield ("conclusion", self._get_id_name(now_id))
+                continue
+
+            for line_id in now_node["anslines_id"]:
+                remaining[line_id] -= 1
+                if remaining[line_id]:
+                    continue
+
+                ans_id = self._lines_list[line_id][1]
+                if ans_id in self._known_set:
+                    continue
+
+                self._reasoner_path.append(line_id)
+                self._known_set.add(ans_id)
+                self._support[ans_id] = line_id
+                stack.append(ans_id)
+                yield ("rule", line_id, self._get_id_name(ans_id))
+
+    def _record_support(self, path: list[int]) -> None:
+        """记录路径中每条规则为其结论的支持"""
+        for line_id in path:
+            self._support[self._lines_list[line_id][1]] = line_id
+
+    def _find_stack(self) -> tuple[list[str], list[int]]:
+        """栈式正向推理：每次弹出事实都重新检查规则的全部前提"""
         result: list[str] = []
         self._reasoner_path.clear()
 
@@ -127,24 +548,452 @@ class RuleReasoner:
 
         return result, self._reasoner_path.copy()
 
-    def step_backward(self, target: str) -> tuple[int, list[str], list[int]]:
+    def _find_counter(self, budget: Optional[Budget] = None) -> tuple[list[str], list[int]]:
+        """
+        计数式正向推理 (Dowling-Gallier)
+        每条规则维护"未满足前提数"，每个事实只处理一次，
+        计数归零时触发规则，总代价与规则库大小成线性关系
+        """
+        result: list[str] = []
+        self._reasoner_path.clear()
+
+        # 重复前提在 anslines_id 中出现多次，计数按出现次数递减即可
+        remaining = [len(pres_id) for pres_id, _ in self._lines_list]
+        stack = list(self._known_set)
+
+        while stack:
+            now_id = stack.pop()
+            now_node = self._node_list[now_id]
+
+            if not now_node["anslines_id"]:
+                result.append(self._get_id_name(now_id))
+                continue
+
+            for line_id in now_node["anslines_id"]:
+                if budget is not None and budget.charge(checks=1):
+                    return result, self._reasoner_path.copy()
+                remaining[line_id] -= 1
+                if remaining[line_id]:
+                    continue
+
+                ans_id = self._lines_list[line_id][1]
+                if ans_id in self._known_set:
+                    continue
+                if budget is not None and budget.charge(rules=1):
+                    return result, self._reasoner_path.copy()
+
+                self._reasoner_path.append(line_id)
+                self._known_set.add(ans_id)
+                stack.append(ans_id)
+
+        return result, self._reasoner_path.copy()
+
+    def _find_rete(self) -> tuple[list[str], list[int]]:
+        """
+        Rete 增量正向推理
+        匹配记忆在多次调用间保留，只传播上次调用之后新增的已知事实
+        """
+        self._reasoner_path.clear()
+
+        if self._rete is None:
+            self._rete = ReteNetwork(self._lines_list, len(self._node_list))
+
+        delta = self._known_set - self._rete.asserted
+        self._rete.assert_facts(delta, self._known_set, self._reasoner_path)
+
+        result = [self._get_id_name(node_id) for node_id in self._rete.terminals]
+        return result, self._reasoner_path.copy()
+
+    def _find_watched(self) -> tuple[list[str], list[int]]:
+        """
+        监视前提正向推理
+        事实成立时只唤醒正监视它的规则，监视表在多次调用间保留，只处理新增的已知事实
+        """
+        self._reasoner_path.clear()
+        if self._watch is None:
+            self._watch = WatchIndex(self._lines_list, len(self._node_list))
+
+        self._watch.propagate(self._known_set, self._node_list, self._reasoner_path)
+        result = [self._get_id_name(node_id) for node_id in self._watch.terminals]
+        return result, self._reasoner_path.copy()
+
+    def compile(self) -> CompiledRuleBase:
+        """获取当前规则库的 CSR 编译结果，reset 后重新编译"""
+        if self._compiled is None:
+            self._compiled = CompiledRuleBase(self._lines_list, len(self._node_list))
+        return self._compiled
+
+    def _find_csr(self) -> tuple[list[str], list[int]]:
+        """在 CSR 编译规则库上执行计数式正向推理"""
+        result: list[str] = []
+        self._reasoner_path.clear()
+
+        crb = self.compile()
+        fwd_offsets, fwd_lines, ans_ids = crb.fwd_offsets, crb.fwd_lines, crb.ans_ids
+        remaining = crb.pre_counts[:]
+        stack = list(self._known_set)
+
+        while stack:
+            now_id = stack.pop()
+
+            # 编译后新出现的事实不参与任何规则
+            if now_id >= crb.fact_count:
+                result.append(self._get_id_name(now_id))
+                continue
+
+            begin, end = fwd_offsets[now_id], fwd_offsets[now_id + 1]
+            if begin == end:
+                result.append(self._get_id_name(now_id))
+                continue
+
+            for line_id in fwd_lines[begin:end]:
+                remaining[line_id] -= 1
+                if remaining[line_id]:
+                    continue
+
+                ans_id = ans_ids[line_id]
+                if ans_id in self._known_set:
+                    continue
+
+                self._reasoner_path.append(line_id)
+                self._known_set.add(ans_id)
+                stack.append(ans_id)
+
+        return result, self._reasoner_path.copy()
+
+    def evaluation_plan(self) -> EvaluationPlan:
+        """获取当前规则库的强连通分量拓扑序求值计划，reset 后重新编译"""
+        if self._plan is None:
+            self._plan = EvaluationPlan(self.compile())
+        return self._plan
+
+    def cycles(self) -> list[list[str]]:
+        """规则库中成环的事实分组（强连通分量）"""
+        return [
+            sorted(self._get_id_name(i) for i in facts)
+            for facts in self.evaluation_plan().cycles()
+        ]
+
+    def _find_topo(self) -> tuple[list[str], list[int]]:
+        """
+        拓扑序正向推理
+        每条规则维护"未满足前提数"，计数归零的规则按结论所在分量的拓扑序放入堆中依次触发，
+        没有规则就绪的分量不会被访问；成环分量内的事实由计数自然传播到不动点
+        """
+        self._reasoner_path.clear()
+        crb = self.compile()
+        rank = self.evaluation_plan().rank
+        fwd_offsets, fwd_lines, ans_ids = crb.fwd_offsets, crb.fwd_lines, crb.ans_ids
+        known = self._known_set
+        remaining = crb.pre_counts[:]
+        ready: list[tuple[int, int]] = []
+
+        def propagate(fact: int):
+            for line_id in fwd_lines[fwd_offsets[fact] : fwd_offsets[fact + 1]]:
+                remaining[line_id] -= 1
+                if not remaining[line_id]:
+                    heapq.heappush(ready, (rank[ans_ids[line_id]], line_id))
+
+        for fact in list(known):
+            if fact < crb.fact_count:
+                propagate(fact)
+
+        while ready:
+            _, line_id = heapq.heappop(ready)
+            ans_id = ans_ids[line_id]
+            if ans_id in known:
+                continue
+            self._reasoner_path.append(line_id)
+            known.add(ans_id)
+            propagate(ans_id)
+
+        result = [
+            self._get_id_name(node_id)
+            for node_id in known
+            if node_id >= crb.fact_count
+            or crb.fwd_offsets[node_id] == crb.fwd_offsets[node_id + 1]
+        ]
+        return result, self._reasoner_path.copy()
+
+    def rules_hash(self) -> str:
+        """当前规则库的内容哈希，reset 后重新计算"""
+        if self._hash is None:
+            rules = [
+                ([self._get_id_name(i) for i in pres_id], self._get_id_name(ans_id))
+                for pres_id, ans_id in self._lines_list
+            ]
+            self._hash = codegen.rules_hash(rules)
+        return self._hash
+
+    def _find_codegen(self) -> tuple[list[str], list[int]]:
+        """调用为当前规则库生成的专用求值模块，只处理上次调用之后新增的已知事实"""
+        self._reasoner_path.clear()
+        if self._codegen is None:
+            module = codegen.load_evaluator(
+                self.rules_hash(),
+                lambda: codegen.generate_source(self.compile()),
+                self.codegen_dir,
+            )
+            self._codegen = codegen.CompiledEvaluator(module)
+
+        self._codegen.evaluate(self._known_set, self._reasoner_path)
+        has_rules = self._codegen.has_rules
+        result = [self._get_id_name(i) for i in self._known_set if i not in has_rules]
+        return result, self._reasoner_path.copy()
+
+    def _find_bitset(self) -> tuple[list[str], list[int]]:
+        """
+        位集合正向推理：已知事实为一个大整数，规则满足判定为掩码与运算
+        按波次推进，规则满足判定只读位集合，每一波新推出的事实一次性并入位集合和 _known_set
+        """
+        result: list[str] = []
+        self._reasoner_path.clear()
+
+        crb = self.compile()
+        if self._bitset is None:
+            self._bitset = BitsetRuleBase(crb)
+        masks, fwd_offsets, fwd_lines, ans_ids = (
+            self._bitset.masks,
+            crb.fwd_offsets,
+            crb.fwd_lines,
+            crb.ans_ids,
+        )
+        fact_count = crb.fact_count
+
+        known_ids = self._known_set
+        known = ids_to_bits(known_ids)
+        wave = list(known_ids)
+
+        while wave:
+            fresh: dict[int, None] = {}  # 本波新推出的事实，保持推出顺序
+            for now_id in wave:
+                if now_id >= fact_count:
+                    result.append(self._get_id_name(now_id))
+                    continue
+
+                begin, end = fwd_offsets[now_id], fwd_offsets[now_id + 1]
+                if begin == end:
+                    result.append(self._get_id_name(now_id))
+                    continue
+
+                for line_id in fwd_lines[begin:end]:
+                    ans_id = ans_ids[line_id]
+                    if ans_id in known_ids or ans_id in fresh:
+                        continue
+
+                    mask = masks[line_id]
+                    if known & mask == mask:
+                        self._reasoner_path.append(line_id)
+                        fresh[ans_id] = None
+
+            wave = list(fresh)
+            known |= ids_to_bits(wave)
+            known_ids.update(wave)
+
+        return result, self._reasoner_path.copy()
+
+    def _dependency_index(self) -> DependencyIndex:
+        """获取当前规则库版本的依赖闭包索引"""
+        if self._deps is None:
+            self._deps = DependencyIndex(self.compile())
+        return self._deps
+
+    def _possible(self) -> set[int]:
+        """当前已知/假事实下仍可能成立的事实集合，事实状态不变时直接复用"""
+        key = (self._version, self._known_epoch, self._false_epoch, self._false_stamp)
+        cached_key, possible = self._possible_cache
+        # 新增的已知事实若都已在集合中，则集合不变
+        if cached_key != key or not self._known_set <= possible:
+            possible = self._dependency_index().possible(self._known_set, self._false_set)
+            self._possible_cache = (key, possible)
+        return self._possible_cache[1]
+
+    def dependencies(self, target: str) -> tuple[list[str], list[int]]:
+        """目标可能依赖的 (原子事实名字列表, 规则id列表)"""
+        if target not in self._name_id_map:
+            return [], []
+        deps = self._dependency_index()
+        target_id = self._name_id_map[target]
+        leaves = sorted(self._get_id_name(i) for i in deps.leaves(target_id))
+        return leaves, sorted(deps.rules(target_id))
+
+    def is_reachable(self, target: str) -> bool:
+        """目标在当前已知/假事实下是否仍可能成立"""
+        target_id = self._name_id_map.get(target)
+        return target_id is not None and target_id in self._possible()
+
+    def reachable_targets(self, targets) -> list[str]:
+        """筛选出仍可能成立的目标"""
+        possible = self._possible()
+        return [t for t in targets if self._name_id_map.get(t, -1) in possible]
+
+    def question_plan(
+        self, target: str, budget: Optional[Budget] = None
+    ) -> list[tuple[str, int]]:
+        """
+        目标的一次性提问计划: [(可询问的原子事实名字, 该事实为假时排除的候选规则数)]
+        按排除数从多到少排列，只包含仍会影响结果的事实；目标已确定时返回空列表
+        预算耗尽时只包含已评估的事实并置 budget.exhausted
+        """
+        target_id = self._name_id_map.get(target)
+        if target_id is None or target_id in self._false_set:
+            return []
+        plan = question_plan(
+            self.compile(),
+            self._dependency_index(),
+            target_id,
+            self._known_set,
+            self._false_set,
+            self._possible(),
+            budget,
+        )
+        return [(self._get_id_name(leaf), eliminated) for leaf, eliminated in plan]
+
+    def fact_names(self) -> list[str]:
+        """按id顺序返回所有事实名字，即批量推理矩阵的列顺序"""
+        return [self._id_name_map[i] for i in range(len(self._id_name_map))]
+
+    def encode_cases(self, cases: list[list[str]]):
+        """把每个案例的已知事实名字列表编码为 (案例数 × 事实数) 布尔矩阵"""
+        np = _require_numpy()
+        ids = [[self._get_name_id(name) for name in case] for case in cases]
+        matrix = np.zeros((len(cases), len(self._node_list)), dtype=bool)
+        for row, case_ids in enumerate(ids):
+            matrix[row, case_ids] = True
+        return matrix
+
+    def find_batch(self, cases):
+        """
+        批量正向推理，不影响当前已知事实
+        cases: (案例数 × 事实数) 布尔矩阵，列顺序见 fact_names()
+        返回 (每个案例的结论名字列表, 触发规则矩阵 (案例数 × 规则数))
+        触发规则指闭包中前提全部满足、且结论不在该案例输入事实中的规则
+        """
+        if self._batch is None:
+            self._batch = BatchEvaluator(self.compile())
+
+        closure, fired = self._batch.run(cases)
+        conclusions = [
+            [self._get_id_name(node_id) for node_id in row]
+            for row in self._batch.conclusions(closure)
+        ]
+        return conclusions, fired
+
+    def _table_key(self) -> tuple[int, int, int]:
+        """子目标表的版本：规则库、假事实减少和尝试顺序"""
+        return (self._version, self._false_epoch, self._order_stamp)
+
+    def prove_many(
+        self, targets: list[str], budget: Optional[Budget] = None
+    ) -> tuple[dict[str, int], list[str], list[int]]:
+        """
+        多目标反向推理
+        各目标共享已知/假事实和子目标表，已得证或已否定的子目标对所有目标生效；每个目标保留自己的推理栈，
+        一次调用依次推进每个目标，直到它需要询问或结束，同一事实在各目标间只询问一次
+        返回: (目标 → 状态, 需要询问的事实名字列表, 路径)，状态含义同 step_backward
+        """
+        saved = (self._bw_stack, self._in_backward, self._table_key())
+        statuses: dict[str, int] = {}
+        to_ask: dict[str, None] = {}
+        path: list[int] = []
+        seen: set[int] = set()
+
+        for target in targets:
+            target_id = self._get_name_id(target)
+
+            # 没有推导规则的目标本身就是待询问的事实，不交给 step_backward 判定为假，以免影响其他目标
+            if not self._node_list[target_id]["prelines_id"]:
+                if target_id in self._known_set:
+                    statuses[target] = 0
+                elif target_id in self._false_set:
+                    statuses[target] = 1
+                else:
+                    statuses[target] = 2
+                    to_ask[target] = None
+                continue
+
+            stack, in_backward, key = self._multi_stacks.get(target_id, ([], -1, ()))
+            # 表版本变化后，保存的推理栈可能基于已失效的否定进度
+            self._bw_stack = stack
+            self._in_backward = in_backward if key == self._table_key() else -1
+
+            status, data, step_path = self.step_backward(target, budget)
+            self._multi_stacks[target_id] = (self._bw_stack, self._in_backward, self._table_key())
+
+            statuses[target] = status
+            if status == 2:
+                to_ask.update(dict.fromkeys(data))
+            for line_id in step_path:
+                if line_id not in seen:
+                    seen.add(line_id)
+                    path.append(line_id)
+
+        stack, in_backward, key = saved
+        self._bw_stack = stack
+        self._in_backward = in_backward if key == self._table_key() else -1
+        return statuses, list(to_ask), path
+
+    def step_backward(
+        self, target: str, budget: Optional[Budget] = None
+    ) -> tuple[int, list[str], list[int]]:
         """
         反向推理单步执行
         返回: (状态, 数据, 路径)
         - 状态 0: 成功, 数据为目标名字
         - 状态 1: 失败, 数据为空
         - 状态 2: 询问, 数据为需要确认的事实名字列表
+        - 状态 3: 预算耗尽, 数据为空，推理栈保留，再次调用从中断处继续
+        """
+        for event in self._backward_events(target, budget):
+            if event[0] == "ask":
+                return 2, event[1], self._reasoner_path.copy()
+            if event[0] == "exhausted":
+                return 3, [], self._reasoner_path.copy()
+            if event[0] == "done":
+                if event[1]:
+                    return 0, [target], self._reasoner_path.copy()
+                return 1, [], self._reasoner_path.copy()
+        return 1, [], self._reasoner_path.copy()
+
+    def iter_backward(self, target: str, budget: Optional[Budget] = None):
         """
+        逐步产出反向推理事件的生成器，事件为元组:
+        - ("rule", 规则id, 事实名字): 规则前提全部满足，事实得证
+        - ("ask", 事实名字列表): 需要询问；调用方通过 add_known/add_false 回答后继续迭代
+        - ("exhausted",): 预算耗尽，推理栈保留
+        - ("done", 目标是否成立): 推理结束
+        """
+        while True:
+            for event in self._backward_events(target, budget):
+                yield event
+                if event[0] == "ask":
+                    break
+                if event[0] in ("exhausted", "done"):
+                    return
+
+    def _backward_events(self, target: str, budget: Optional[Budget] = None):
+        """反向推理主循环，状态保存在推理栈中，生成器可随时丢弃"""
         target_id = self._get_name_id(target)
         self._reasoner_path.clear()
         self._reasoner_set.clear()
 
-        # 如果目标改变，重置栈
+        # 规则库、假事实或尝试顺序变化后，表中记录的否定进度失效
+        table_key = self._table_key()
+        if self._bw_table_key != table_key:
+            self._bw_table.clear()
+            self._bw_table_key = table_key
+            self._in_backward = -1
+
+        # 如果目标改变，重置栈（已探索过的子目标从表中记录的进度继续）
         if self._in_backward != target_id:
             self._bw_stack.clear()
-            self._bw_stack.append({"u": target_id, "rule_idx": 0})
+            self._bw_stack.append({"u": target_id, "rule_idx": self._bw_table.get(target_id, 0)})
             self._in_backward = target_id
 
+        # 每条支持路径都会遇到假事实的目标直接判定为假，不再展开
+        possible = self._possible()
+        planner = self._backward_planner() if self._backward_order == "cost" else None
+
         while self._bw_stack:
             top = self._bw_stack[-1]
             u = top["u"]
@@ -159,20 +1008,37 @@ class RuleReasoner:
                 self._bw_stack.pop()
                 continue
 
-            rules = self._node_list[u]["prelines_id"]
+            if u not in possible:
+                self._false_set.add(u)
+                self._bw_stack.pop()
+                continue
+
+            rules = planner.rule_order(u) if planner else self._node_list[u]["prelines_id"]
 
             # 所有规则都尝试过了，标记为假
             if top["rule_idx"] >= len(rules):
-                self._false_set.add(u)
                 self._bw_stack.pop()
+                low = top.get("low")
+                if low is not None and low < len(self._bw_stack):
+                    # 失败依赖仍在栈中的祖先，不能记为假：只让父目标放弃当前规则
+                    parent = self._bw_stack[-1]
+                    parent["rule_idx"] += 1
+                    parent["low"] = min(low, parent.get("low", low))
+                else:
+                    self._false_set.add(u)
                 continue
 
             line_id = rules[top["rule_idx"]]
-            pres_id, _ = self._lines_list[line_id]
+            pres_id = planner.premise_order(line_id) if planner else self._lines_list[line_id][0]
+
+            if budget is not None and budget.charge(checks=len(pres_id)):
+                yield ("exhausted",)
+                return
 
             rule_possible = True
             subgoal: Optional[int] = None
             to_ask: list[str] = []
+            ask_first = False  # 按代价规划时，排在子目标之前的询问先进行
 
             for pre_id in pres_id:
                 # 如果前提已知为假，规则不可行
@@ -184,37 +1050,272 @@ class RuleReasoner:
                 if pre_id in self._known_set:
                     continue
 
+                # 如果前提每条支持路径都会遇到假事实，规则不可行
+                if pre_id not in possible:
+                    rule_possible = False
+                    break
+
                 # 如果前提没有推导规则，需要询问用户
                 if not self._node_list[pre_id]["prelines_id"]:
                     to_ask.append(self._get_id_name(pre_id))
+                    ask_first = ask_first or (planner is not None and subgoal is None)
                 else:
                     # 有推导规则，设为子目标
                     if subgoal is None:
                         subgoal = pre_id
 
-            # 规则不可行，尝试下一条规则
+            # 子目标已在栈中（规则成环），沿此规则只会无限展开，跳过该规则
+            # low 记录所依赖的最深祖先位置，失败时据此判断能否记为假
+            if rule_possible and subgoal is not None and not ask_first:
+                depth = next(
+                    (i for i, frame in enumerate(self._bw_stack) if frame["u"] == subgoal), None
+                )
+                if depth is not None:
+                    top["low"] = min(depth, top.get("low", depth))
+                    top["rule_idx"] += 1
+                    continue
+
+            # 规则不可行，尝试下一条规则；进度依赖祖先时不写入子目标表
             if not rule_possible:
                 top["rule_idx"] += 1
+                if "low" not in top:
+                    self._bw_table[u] = top["rule_idx"]
                 continue
 
             # 有子目标需要先证明
-            if subgoal is not None:
-                self._bw_stack.append({"u": subgoal, "rule_idx": 0})
+            if subgoal is not None and not ask_first:
+                self._bw_stack.append({"u": subgoal, "rule_idx": self._bw_table.get(subgoal, 0)})
                 continue
 
             # 需要询问用户
             if to_ask:
-                return 2, to_ask, self._reasoner_path.copy()
+                yield ("ask", to_ask)
+                return
 
             # 所有前提满足，目标成立
+            if budget is not None and budget.charge(rules=1):
+                yield ("exhausted",)
+                return
             self._known_set.add(u)
+            self._support[u] = line_id
             if line_id not in self._reasoner_set:
                 self._reasoner_path.append(line_id)
                 self._reasoner_set.add(line_id)
             self._bw_stack.pop()
+            yield ("rule", line_id, self._get_id_name(u))
 
         self._in_backward = -1
+        yield ("done", target_id in self._known_set)
 
-        if target_id in self._known_set:
-            return 0, [target], self._reasoner_path.copy()
-        return 1, [], self._reasoner_path.copy()
+    def _proof_order(self) -> str:
+        """
+        可序列化状态记录的尝试顺序；按代价时带上回答频率的指纹，
+        频率不同的推理器给出的规则顺序不同，不能继续彼此的状态
+        """
+        if self._backward_order != "cost":
+            return self._backward_order
+        payload = json.dumps(
+            [sorted(self._answer_freq.items()), self._answer_default], ensure_ascii=False
+        )
+        return "cost:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def start_proof(self, target: str) -> BackwardProof:
+        """
+        以当前已知/假事实为起点创建可序列化的反向推理状态，不影响推理器自身的事实
+        状态按当前的 backward_order 尝试规则和前提
+        """
+        return BackwardProof(
+            target,
+            self.rules_hash(),
+            [self._get_id_name(i) for i in sorted(self._known_set)],
+            [self._get_id_name(i) for i in sorted(self._false_set)],
+            self._proof_order(),
+        )
+
+    def resume_proof(
+        self,
+        proof: BackwardProof,
+        true_facts: Optional[list[str]] = None,
+        false_facts: Optional[list[str]] = None,
+        budget: Optional[Budget] = None,
+    ) -> tuple[int, list[str], list[int]]:
+        """
+        继续执行 proof，true_facts/false_facts 为对上次询问的回答
+        返回值与 step_backward 相同，路径为本次调用得证所用的规则id；状态原地更新
+        推理栈帧记录已成立的前提位置，询问或预算耗尽后继续时不重复检查这些前提
+        """
+        if proof.rules_hash != self.rules_hash():
+            raise ValueError("推理状态与当前规则库不一致")
+        if proof.order != self._proof_order():
+            raise ValueError("推理状态的尝试顺序与当前推理器不一致")
+        if proof.status is not None:
+            return proof.status, [proof.target] if proof.status == 0 else [], []
+
+        known = {self._get_name_id(name) for name in proof.known}
+        false = {self._get_name_id(name) for name in proof.false}
+        for name in true_facts or []:
+            known.add(self._get_name_id(name))
+            proof.known.append(name)
+        for name in false_facts or []:
+            false.add(self._get_name_id(name))
+            proof.false.append(name)
+            proof._possible = None
+
+        if proof._possible is None:
+            proof._possible = self._dependency_index().possible(known, false)
+        possible = proof._possible
+
+        frames = [[self._get_name_id(name), *rest] for name, *rest in proof.frames]
+        path: list[int] = []
+        planner = self._backward_planner() if self._backward_order == "cost" else None
+
+        def save(status: Optional[int]) -> None:
+            proof.frames = [[self._get_id_name(u), *rest] for u, *rest in frames]
+            proof.path.extend(path)
+            proof.status = status
+
+        while frames:
+            frame = frames[-1]
+            u, rule_idx, pos, low = frame
+
+            if u in known or u in false:
+                frames.pop()
+                continue
+
+            rules = planner.rule_order(u) if planner else self._node_list[u]["prelines_id"]
+            if u not in possible or rule_idx >= len(rules):
+                frames.pop()
+                if u in possible and low is not None and low < len(frames):
+                    # 与 step_backward 一致：失败依赖栈中的祖先时不记为假，父目标放弃当前规则
+                    parent = frames[-1]
+                    parent[1] += 1
+                    parent[2] = 0
+                    parent[3] = low if parent[3] is None else min(low, parent[3])
+                else:
+                    false.add(u)
+                    proof.false.append(self._get_id_name(u))
+                continue
+
+            line_id = rules[rule_idx]
+            pres_id = planner.premise_order(line_id) if planner else self._lines_list[line_id][0]
+
+            if budget is not None and budget.charge(checks=len(pres_id) - pos):
+                save(None)
+                return 3, [], path
+
+            # 跳过已成立的前缀前提，并记录位置
+            while pos < len(pres_id) and pres_id[pos] in known:
+                pos += 1
+            frame[2] = pos
+
+            rule_possible = True
+            subgoal: Optional[int] = None
+            to_ask: list[str] = []
+            ask_first = False  # 与 step_backward 一致：按代价规划时，排在子目标之前的询问先进行
+
+            for pre_id in pres_id[pos:]:
+                if pre_id in false or (pre_id not in known and pre_id not in possible):
+                    rule_possible = False
+                    break
+                if pre_id in known:
+                    continue
+                if not self._node_list[pre_id]["prelines_id"]:
+                    to_ask.append(self._get_id_name(pre_id))
+                    ask_first = ask_first or (planner is not None and subgoal is None)
+                elif subgoal is None:
+                    subgoal = pre_id
+
+            # 子目标已在栈中（规则成环），跳过该规则并记录所依赖的最深祖先位置
+            if rule_possible and subgoal is not None and not ask_first:
+                depth = next((i for i, f in enumerate(frames) if f[0] == subgoal), None)
+                if depth is not None:
+                    frame[3] = depth if low is None else min(depth, low)
+                    rule_possible = False
+
+            if not rule_possible:
+                frame[1] += 1
+                frame[2] = 0
+                continue
+
+            if subgoal is not None and not ask_first:
+                frames.append([subgoal, 0, 0, None])
+                continue
+
+            if to_ask:
+                save(None)
+                return 2, to_ask, path
+
+            if budget is not None and budget.charge(rules=1):
+                save(None)
+                return 3, [], path
+            known.add(u)
+            proof.known.append(self._get_id_name(u))
+            path.append(line_id)
+            frames.pop()
+
+        target_id = self._get_name_id(proof.target)
+        if target_id in known:
+            save(0)
+            return 0, [proof.target], path
+        save(1)
+        return 1, [], path
+
+    def decision_tree(
+        self, target: str, budget: Optional[Budget] = None, compile: bool = True
+    ) -> DecisionTree:
+        """
+        获取目标的预编译决策树，编译结果（包括失败）按规则库哈希在推理器之间共享，每个规则库只编译一次
+        compile=False 时不在调用中编译，尚未编译时抛出 ValueError；
+        规模超出上限、预算耗尽或此前编译失败时抛出 ValueError
+        """
+        rules_hash = self.rules_hash()
+        entry = SHARED_TREES.get(rules_hash, target)
+        if entry is None:
+            if not compile:
+                raise ValueError("决策树尚未编译，请使用逐步反向推理")
+            try:
+                entry = DecisionTree(
+                    self.compile(), self._dependency_index(), self._get_name_id(target), budget
+                )
+            except ValueError as e:
+                entry = str(e)
+            SHARED_TREES.put(rules_hash, target, entry)
+        if isinstance(entry, str):
+            raise ValueError(entry)
+        return entry
+
+    def describe_decision_tree(self, target: str, compile: bool = True) -> dict:
+        """
+        以名字描述目标的决策树，供查看
+        节点的 yes/no 为下一节点下标，或 "proven"/"refuted" 表示目标成立/不成立
+        """
+        tree = self.decision_tree(target, compile=compile)
+        outcome = {PROVEN: "proven", REFUTED: "refuted"}
+
+        def ref(node: int):
+            return outcome.get(node, node)
+
+        return {
+            "target": target,
+            "expected_questions": tree.expected_questions,
+            "root": ref(tree.root),
+            "nodes": [
+                {"ask": self._get_id_name(fact), "yes": ref(yes), "no": ref(no)}
+                for fact, yes, no in tree.nodes
+            ],
+        }
+
+    def step_decision(self, target: str, compile: bool = True) -> tuple[int, list[str], list[int]]:
+        """
+        按预编译决策树执行反向推理的一步，返回值与 step_backward 相同
+        已回答的事实直接走对应分支，每次最多询问一个事实；目标成立时用目标导向正向推理给出路径
+        compile 含义同 decision_tree
+        """
+        tree = self.decision_tree(target, compile=compile)
+        node = tree.walk(self._known_set, self._false_set)
+        if node == PROVEN:
+            _, path = self.find(targets=[target], stop_on_first=True)
+            return 0, [target], path
+        if node == REFUTED:
+            return 1, [], []
+        return 2, [self._get_id_name(tree.nodes[node][0])], []
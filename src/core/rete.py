@@ -0,0 +1,122 @@
+"""
+Rete 风格的增量匹配网络
+规则前提均为命题原子，alpha 记忆退化为"事实是否已断言"，
+beta 记忆记录"前提前缀是否全部满足"，前缀相同的规则共享 beta 节点
+"""
+
+from collections import Counter
+
+
+class ReteNetwork:
+    """增量匹配网络，断言新事实时只沿网络传播增量"""
+
+    def __init__(self, lines_list: list[tuple[list[int], int]], node_count: int) -> None:
+        """根据规则列表构建网络，node_count 为事实总数"""
+        # beta 节点，0 号为根节点（空前缀，恒满足）
+        self._beta_fact: list[int] = [-1]  # 节点对应的前提事实id
+        self._beta_parent: list[int] = [-1]  # 父节点
+        self._beta_children: list[list[int]] = [[]]  # 子节点
+        self._beta_rules: list[list[int]] = [[]]  # 在该节点完成匹配的规则
+        self._alpha_succ: list[list[int]] = [[] for _ in range(node_count)]  # 事实 → 以其为右输入的 beta 节点
+        self._rule_ans: list[int] = [ans_id for _, ans_id in lines_list]
+
+        # 出现频率高的前提排在前面，使共享前缀尽可能长
+        freq = Counter(pre_id for pres_id, _ in lines_list for pre_id in set(pres_id))
+        edges: dict[tuple[int, int], int] = {}
+
+        for line_id, (pres_id, _) in enumerate(lines_list):
+            if not pres_id:
+                continue
+            now = 0
+            for pre_id in sorted(set(pres_id), key=lambda x: (-freq[x], x)):
+                child = edges.get((now, pre_id))
+                if child is None:
+                    child = len(self._beta_fact)
+                    edges[(now, pre_id)] = child
+                    self._beta_fact.append(pre_id)
+                    self._beta_parent.append(now)
+                    self._beta_children.append([])
+                    self._beta_rules.append([])
+                    self._beta_children[now].append(child)
+                    self._alpha_succ[pre_id].append(child)
+                now = child
+            self._beta_rules[now].append(line_id)
+
+        # 匹配记忆，在多次 find 之间保留
+        self._active: list[bool] = []
+        self.asserted: set[int] = set()
+        self.terminals: dict[int, None] = {}  # 已断言且不参与任何规则的事实（保持插入顺序）
+        self.clear_memory()
+
+    @property
+    def beta_count(self) -> int:
+        """beta 节点数（不含根节点）"""
+        return len(self._beta_fact) - 1
+
+    def clear_memory(self) -> None:
+        """清空匹配记忆，保留网络结构"""
+        self._active = [False] * len(self._beta_fact)
+        self._active[0] = True
+        self.asserted.clear()
+        self.terminals.clear()
+
+    def assert_facts(self, facts, known_set: set[int], path: list[int]) -> None:
+        """
+        断言一批新事实并传播到不动点
+        触发的规则追加到 path，推出的结论加入 known_set
+        """
+        pending = [f for f in facts if f not in self.asserted]
+        active = self._active
+
+        while pending:
+            fact = pending.pop()
+            if fact in self.asserted:
+                continue
+            self.asserted.add(fact)
+            known_set.add(fact)
+
+            # 构建网络后新出现的事实不参与任何规则
+            if fact >= len(self._alpha_succ) or not self._alpha_succ[fact]:
+                self.terminals[fact] = None
+                continue
+
+            # 右激活：父节点已满足的 beta 节点被激活
+            ready = [b for b in self._alpha_succ[fact] if active[self._beta_parent[b]]]
+
+            # 左激活：沿子节点向下传播
+            while ready:
+                beta = ready.pop()
+                if active[beta]:
+                    continue
+                active[beta] = True
+
+                for line_id in self._beta_rules[beta]:
+                    ans_id = self._rule_ans[line_id]
+                    if ans_id in known_set:
+                        continue
+                    path.append(line_id)
+                    known_set.add(ans_id)
+                    pending.append(ans_id)
+
+                for child in self._beta_children[beta]:
+                    if self._beta_fact[child] in self.asserted:
+                        ready.append(child)
+
+    def retract_facts(self, facts) -> None:
+        """撤回已断言的事实，依赖它们的 beta 节点（及其后代）一并失活"""
+        active = self._active
+        for fact in facts:
+            if fact not in self.asserted:
+                continue
+            self.asserted.discard(fact)
+            self.terminals.pop(fact, None)
+            if fact >= len(self._alpha_succ):
+                continue
+
+            stack = [b for b in self._alpha_succ[fact] if active[b]]
+            while stack:
+                beta = stack.pop()
+                if not active[beta]:
+                    continue
+                active[beta] = False
+                stack.extend(c for c in self._beta_children[beta] if active[c])
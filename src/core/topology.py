@@ -0,0 +1,96 @@
+"""
+规则图的强连通分量缩点与拓扑序
+事实图中每条规则连出 前提 → 结论 的边；缩点后按拓扑序一次扫描即可完成无环部分的正向推理，
+只有成环的分量需要不动点迭代。编译结果同时报告规则库中的循环
+"""
+
+from .compiled import CompiledRuleBase
+
+
+def _tarjan(crb: CompiledRuleBase) -> tuple[list[int], int]:
+    """
+    迭代版 Tarjan 算法
+    返回 (每个事实所属分量id, 分量数)，分量id按完成顺序编号，即逆拓扑序
+    """
+    n = crb.fact_count
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    comp = [-1] * n
+    stack: list[int] = []
+    counter = 0
+    comp_count = 0
+
+    def successors(fact: int):
+        for i in range(crb.fwd_offsets[fact], crb.fwd_offsets[fact + 1]):
+            yield crb.ans_ids[crb.fwd_lines[i]]
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, successors(root))]
+
+        while work:
+            fact, it = work[-1]
+            for nxt in it:
+                if index[nxt] == -1:
+                    index[nxt] = low[nxt] = counter
+                    counter += 1
+                    stack.append(nxt)
+                    on_stack[nxt] = True
+                    work.append((nxt, successors(nxt)))
+                    break
+                if on_stack[nxt]:
+                    low[fact] = min(low[fact], index[nxt])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[fact])
+                if low[fact] == index[fact]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        comp[member] = comp_count
+                        if member == fact:
+                            break
+                    comp_count += 1
+
+    return comp, comp_count
+
+
+class EvaluationPlan:
+    """
+    按拓扑序排列的求值计划
+    - components: 分量列表（拓扑序，前提所在分量排在结论之前），每项为 (事实id列表, 推出该分量事实的规则id列表, 是否成环)
+    - rank: 事实id → 所属分量在 components 中的下标
+    """
+
+    def __init__(self, crb: CompiledRuleBase) -> None:
+        comp, comp_count = _tarjan(crb)
+        facts: list[list[int]] = [[] for _ in range(comp_count)]
+        rules: list[list[int]] = [[] for _ in range(comp_count)]
+        cyclic = [False] * comp_count
+
+        for fact, c in enumerate(comp):
+            facts[c].append(fact)
+        for line_id in range(crb.rule_count):
+            c = comp[crb.ans_ids[line_id]]
+            rules[c].append(line_id)
+            # 规则的某个前提与结论在同一分量内，说明存在循环（含自环）
+            if any(comp[pre_id] == c for pre_id in crb.premises(line_id)):
+                cyclic[c] = True
+
+        # Tarjan 的完成顺序是逆拓扑序
+        self.rank: list[int] = [comp_count - 1 - c for c in comp]
+        self.components: list[tuple[list[int], list[int], bool]] = [
+            (facts[c], rules[c], cyclic[c]) for c in reversed(range(comp_count))
+        ]
+
+    def cycles(self) -> list[list[int]]:
+        """成环分量中的事实id"""
+        return [facts for facts, _, cyclic in self.components if cyclic]
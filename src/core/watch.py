@@ -0,0 +1,68 @@
+"""
+监视前提的规则索引
+借鉴 SAT 求解器的监视文字：每条规则只挂在一个尚未满足的前提上，
+该前提成立时规则被唤醒，再把监视移到下一个未满足的前提；找不到时规则触发。
+枢纽事实成立时只唤醒正监视它的规则，而不是它参与的全部规则。
+
+SAT 需要两个监视文字来发现单元子句；产生式规则只在前提全部成立时触发，
+监视一个未满足的前提即足以保证不漏触发
+"""
+
+
+class WatchIndex:
+    """监视表在多次 find 之间保留，只处理新增的已知事实"""
+
+    def __init__(self, lines_list: list[tuple[list[int], int]], node_count: int) -> None:
+        self._lines_list = lines_list
+        self._watchers: list[list[int]] = [[] for _ in range(node_count)]  # 事实 → 监视它的规则
+        self._watch_pos: list[int] = [0] * len(lines_list)  # 规则当前监视的前提下标
+        for line_id, (pres_id, _) in enumerate(lines_list):
+            if pres_id:
+                self._watchers[pres_id[0]].append(line_id)
+
+        self.processed: set[int] = set()  # 已处理过的已知事实
+        self.terminals: dict[int, None] = {}  # 已处理且不参与任何规则的事实（保持插入顺序）
+
+    def clear_memory(self) -> None:
+        """
+        已知事实减少后调用，下次传播时重新处理全部已知事实
+        监视位置无需重置：被监视的前提若已成立，重新处理时会把监视移到未满足的前提上
+        """
+        self.processed.clear()
+        self.terminals.clear()
+
+    def propagate(self, known_set: set[int], node_list: list[dict], path: list[int]) -> None:
+        """处理新增的已知事实并传播到不动点，触发的规则追加到 path"""
+        watchers, watch_pos, lines_list = self._watchers, self._watch_pos, self._lines_list
+        stack = list(known_set - self.processed)
+
+        while stack:
+            fact = stack.pop()
+            if fact in self.processed:
+                continue
+            self.processed.add(fact)
+
+            # 构建索引后新出现的事实不参与任何规则
+            if fact >= len(watchers) or not node_list[fact]["anslines_id"]:
+                self.terminals[fact] = None
+                continue
+
+            woken = watchers[fact]
+            watchers[fact] = staying = []
+            for line_id in woken:
+                pres_id, ans_id = lines_list[line_id]
+                count, pos = len(pres_id), watch_pos[line_id]
+
+                # 从当前位置往后循环查找下一个未满足的前提
+                for step in range(1, count):
+                    i = (pos + step) % count
+                    if pres_id[i] not in known_set:
+                        watch_pos[line_id] = i
+                        watchers[pres_id[i]].append(line_id)
+                        break
+                else:
+                    staying.append(line_id)
+                    if ans_id not in known_set:
+                        path.append(line_id)
+                        known_set.add(ans_id)
+                        stack.append(ans_id)
@@ -1,4 +1,5 @@
-from .storage import DataStorage
+from .storage import BACKENDS, DataStorage
+from .backends import JsonBackend, SqliteBackend, StorageBackend
 from .constants import DEFAULT_RULES
 
-__all__ = ["DataStorage", "DEFAULT_RULES"]
+__all__ = ["DataStorage", "BACKENDS", "StorageBackend", "JsonBackend", "SqliteBackend", "DEFAULT_RULES"]
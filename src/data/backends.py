@@ -0,0 +1,666 @@
+"""
+存储后端
+DataStorage 把规则、用户和推理历史的读写交给后端：
+- JsonBackend: 规则为快照文件加操作日志，用户为 JSON 文件，推理历史为追加写的 JSONL 日志
+- SqliteBackend: 嵌入式 SQLite 数据库，历史按 (用户名, 时间) 建索引，分页、筛选和删除都是索引查询
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+
+from .fileio import atomic_write_text, file_lock, read_json, write_json
+
+# 推理历史保留的最近记录数
+HISTORY_LIMIT = 1000
+# 历史日志行数超过该值时在后台压缩到保留条数
+_COMPACT_THRESHOLD = 2 * HISTORY_LIMIT
+# 规则操作日志的条数超过该值且超过规则数时，写入新快照并清空日志
+_JOURNAL_LIMIT = 1000
+
+
+class StorageBackend:
+    """
+    存储后端接口
+    规则为 [(前提列表, 结论)]，用户数据为 {"users": {用户名: 信息}}，历史记录为字典，按添加顺序排列
+    """
+
+    def load_rules(self) -> list[tuple[list[str], str]]:
+        """加载规则，没有规则时返回空列表"""
+        raise NotImplementedError
+
+    def save_rules(self, rules: list[tuple[list[str], str]]):
+        """整体保存规则，内容不变的规则保留原 id"""
+        raise NotImplementedError
+
+    def load_rule_table(self) -> tuple[list[int], list[tuple[list[str], str]]]:
+        """加载规则及各规则的稳定 id，返回 (id 列表, 规则列表)，顺序一致"""
+        raise NotImplementedError
+
+    def add_rule(self, premises: list[str], conclusion: str) -> int:
+        """在末尾添加一条规则，返回其 id"""
+        raise NotImplementedError
+
+    def update_rule(self, rule_id: int, premises: list[str], conclusion: str):
+        """修改 id 对应的规则，位置不变"""
+        raise NotImplementedError
+
+    def delete_rule(self, rule_id: int):
+        """删除 id 对应的规则"""
+        raise NotImplementedError
+
+    def load_users(self) -> dict:
+        """加载用户数据"""
+        raise NotImplementedError
+
+    def save_users(self, data: dict):
+        """保存用户数据"""
+        raise NotImplementedError
+
+    def update_users(self, update):
+        """
+        读取-修改-保存用户数据：update(data) 就地修改 data 并返回结果，data 未被修改时不写入
+        返回 update 的返回值；默认实现不加锁，后端应保证整个过程的原子性
+        """
+        data = self.load_users()
+        before = copy.deepcopy(data)
+        result = update(data)
+        if data != before:
+            self.save_users(data)
+        return result
+
+    def data_stamp(self, kind: str):
+        """
+        规则（kind="rules"）或用户（kind="users"）数据的外部修改标记，数据被其他进程修改后标记随之改变
+        返回 None 表示无法检测外部修改，调用方不应缓存
+        """
+        return None
+
+    def load_history(self) -> list:
+        """加载最近的推理历史，按添加顺序"""
+        raise NotImplementedError
+
+    def save_history(self, history: list):
+        """整体替换推理历史"""
+        raise NotImplementedError
+
+    def add_history(self, record: dict):
+        """添加一条历史记录"""
+        raise NotImplementedError
+
+    def add_history_batch(self, records: list):
+        """按顺序添加多条历史记录，后端可一次写入"""
+        for record in records:
+            self.add_history(record)
+
+    def history_fact_counts(self) -> tuple[dict[str, int], int]:
+        """返回 (事实 → 将其确认为真的历史记录数, 历史记录总数)"""
+        counts: dict[str, int] = {}
+        history = self.load_history()
+        for record in history:
+            for fact in set(record.get("facts", [])):
+                counts[fact] = counts.get(fact, 0) + 1
+        return counts, len(history)
+
+    def query_history(
+        self, username: str | None = None, offset: int = 0, limit: int | None = None
+    ) -> tuple[list, int]:
+        """
+        按时间倒序分页查询历史（最新的在前），username 为 None 时查询所有用户
+        返回: (本页记录, 总数)
+        """
+        history = self.load_history()
+        if username is not None:
+            history = [h for h in history if h.get("username") == username]
+        history.reverse()
+        end = None if limit is None else offset + limit
+        return history[offset:end], len(history)
+
+    def delete_history(self, history_id: str, username: str | None = None) -> bool:
+        """删除一条历史记录，username 不为 None 时只能删除该用户的记录，返回是否删除"""
+        history = self.load_history()
+        kept = [
+            h
+            for h in history
+            if h.get("id") != history_id or (username is not None and h.get("username") != username)
+        ]
+        if len(kept) == len(history):
+            return False
+        self.save_history(kept)
+        return True
+
+    def clear_history(self, username: str | None = None):
+        """清空历史，username 不为 None 时只清空该用户的记录"""
+        if username is None:
+            self.save_history([])
+        else:
+            self.save_history([h for h in self.load_history() if h.get("username") != username])
+
+
+def _match_rule_ids(
+    existing: list[tuple[int, tuple]], rules: list[tuple[list[str], str]]
+) -> tuple[list[tuple[int, int]], list[int], list[int]]:
+    """
+    整体保存规则时沿用内容相同的规则的 id（重复规则按出现顺序依次对应）
+    existing 为 [(id, (前提列表, 结论))]
+    返回: ([(位置, 沿用的 id)], 新规则的位置列表, 删除的 id 列表)
+    """
+    ids_by_rule: dict[tuple, list[int]] = {}
+    for rule_id, (pres, ans) in existing:
+        ids_by_rule.setdefault((tuple(pres), ans), []).append(rule_id)
+
+    kept: list[tuple[int, int]] = []
+    added: list[int] = []
+    for position, (pres, ans) in enumerate(rules):
+        ids = ids_by_rule.get((tuple(pres), ans))
+        if ids:
+            kept.append((position, ids.pop(0)))
+        else:
+            added.append(position)
+    removed = [rule_id for ids in ids_by_rule.values() for rule_id in ids]
+    return kept, added, removed
+
+
+class JsonBackend(StorageBackend):
+    """JSON 文件后端"""
+
+    def __init__(self, base_path: str):
+        # 规则快照 {"rules": [[前提, 结论]], "ids": [...], "next_id": 下一个 id, "seq": 已包含的日志序号}
+        # 之后的修改追加到操作日志，每行为 {"seq": 序号, "op": "add"/"update"/"delete", "id": 规则id, ...}
+        self.rules_file = os.path.join(base_path, "rules.json")
+        self.rules_journal_file = os.path.join(base_path, "rules.journal.jsonl")
+        self.users_file = os.path.join(base_path, "users.json")
+        self._rule_table: dict[int, tuple[list[str], str]] = {}  # id → 规则，按规则库顺序
+        self._next_id = 0
+        self._seq = 0
+        self._journal_ops = 0  # 日志中快照之后的操作数
+        self._rules_stamp = None  # 内存中的规则对应的文件标记，None 表示尚未读取
+        # 推理历史为追加写的 JSONL 日志，每行一条记录；旧版 JSON 文件在首次访问时迁移
+        self.history_file = os.path.join(base_path, "inference_history.jsonl")
+        self.legacy_history_file = os.path.join(base_path, "inference_history.json")
+        self._history_lines: int | None = None  # 日志当前行数，首次访问时统计
+        self._compacting = False
+
+    # ========== 规则 ==========
+
+    def _read_rules(self):
+        """读取快照并重放其后的操作日志，调用方需持有锁"""
+        data = read_json(self.rules_file, {"rules": []})
+        rules = data.get("rules", [])
+        # 旧版规则文件没有 id，按位置编号
+        ids = data.get("ids", list(range(len(rules))))
+        self._rule_table = {rule_id: (pres, ans) for rule_id, (pres, ans) in zip(ids, rules)}
+        self._next_id = data.get("next_id", len(rules))
+        self._seq = data.get("seq", 0)
+        self._journal_ops = 0
+
+        if os.path.exists(self.rules_journal_file):
+            with open(self.rules_journal_file, "r", encoding="utf-8") as f:
+                journal = f.read()
+            if journal and not journal.endswith("\n"):
+                # 补全中断写入留下的半行，避免与下一条操作连在一起
+                with open(self.rules_journal_file, "a", encoding="utf-8") as f:
+                    f.write("\n")
+            for line in journal.splitlines():
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    continue
+                # 快照已包含的操作跳过（写快照后、清空日志前中断时会出现）
+                if op["seq"] <= self._seq:
+                    continue
+                self._apply_rule_op(op)
+                self._seq = op["seq"]
+                self._journal_ops += 1
+        self._rules_stamp = self.data_stamp("rules")
+
+    def _apply_rule_op(self, op: dict):
+        rule_id = op["id"]
+        if op["op"] == "add":
+            self._rule_table[rule_id] = (op["premises"], op["conclusion"])
+            self._next_id = max(self._next_id, rule_id + 1)
+        elif op["op"] == "update":
+            if rule_id in self._rule_table:
+                self._rule_table[rule_id] = (op["premises"], op["conclusion"])
+        elif op["op"] == "delete":
+            self._rule_table.pop(rule_id, None)
+
+    def _refresh_rules(self):
+        """文件被其他进程修改或尚未读取时重新读取，调用方需持有锁"""
+        if self._rules_stamp is None or self._rules_stamp != self.data_stamp("rules"):
+            self._read_rules()
+
+    def _write_rules_snapshot(self):
+        """写入当前规则的快照并清空操作日志，调用方需持有锁"""
+        snapshot = {
+            "rules": [[pres, ans] for pres, ans in self._rule_table.values()],
+            "ids": list(self._rule_table),
+            "next_id": self._next_id,
+            "seq": self._seq,
+        }
+        atomic_write_text(self.rules_file, json.dumps(snapshot, ensure_ascii=False, indent=4))
+        if os.path.exists(self.rules_journal_file):
+            os.remove(self.rules_journal_file)
+        self._journal_ops = 0
+        self._rules_stamp = self.data_stamp("rules")
+
+    def _append_rule_op(self, op: dict):
+        """应用一条操作并追加到日志，日志过长时写入新快照，调用方需持有锁"""
+        self._seq += 1
+        op["seq"] = self._seq
+        with open(self.rules_journal_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(op, ensure_ascii=False) + "\n")
+        self._apply_rule_op(op)
+        self._journal_ops += 1
+        if self._journal_ops > max(_JOURNAL_LIMIT, len(self._rule_table)):
+            self._write_rules_snapshot()
+        else:
+            self._rules_stamp = self.data_stamp("rules")
+
+    def load_rules(self) -> list[tuple[list[str], str]]:
+        return self.load_rule_table()[1]
+
+    def load_rule_table(self) -> tuple[list[int], list[tuple[list[str], str]]]:
+        with file_lock(self.rules_file):
+            self._refresh_rules()
+            return list(self._rule_table), [(list(p), a) for p, a in self._rule_table.values()]
+
+    def save_rules(self, rules: list[tuple[list[str], str]]):
+        with file_lock(self.rules_file):
+            self._refresh_rules()
+            kept, added, _ = _match_rule_ids(list(self._rule_table.items()), rules)
+            ids = dict(kept)
+            for position in added:
+                ids[position] = self._next_id
+                self._next_id += 1
+            self._rule_table = {
+                ids[position]: (list(pres), ans) for position, (pres, ans) in enumerate(rules)
+            }
+            self._write_rules_snapshot()
+
+    def add_rule(self, premises: list[str], conclusion: str) -> int:
+        with file_lock(self.rules_file):
+            self._refresh_rules()
+            rule_id = self._next_id
+            self._append_rule_op(
+                {"op": "add", "id": rule_id, "premises": list(premises), "conclusion": conclusion}
+            )
+            return rule_id
+
+    def update_rule(self, rule_id: int, premises: list[str], conclusion: str):
+        with file_lock(self.rules_file):
+            self._refresh_rules()
+            self._append_rule_op(
+                {"op": "update", "id": rule_id, "premises": list(premises), "conclusion": conclusion}
+            )
+
+    def delete_rule(self, rule_id: int):
+        with file_lock(self.rules_file):
+            self._refresh_rules()
+            self._append_rule_op({"op": "delete", "id": rule_id})
+
+    # ========== 用户 ==========
+
+    def load_users(self) -> dict:
+        return read_json(self.users_file, {"users": {}})
+
+    def save_users(self, data: dict):
+        write_json(self.users_file, data)
+
+    def update_users(self, update):
+        """在用户文件的锁内读取、修改并原子写入"""
+        with file_lock(self.users_file):
+            data = read_json(self.users_file, {"users": {}})
+            before = copy.deepcopy(data)
+            result = update(data)
+            if data != before:
+                # 已持有文件锁，直接写入，不经过合并写入
+                atomic_write_text(self.users_file, json.dumps(data, ensure_ascii=False, indent=4))
+            return result
+
+    def data_stamp(self, kind: str):
+        """文件的修改时间和大小（规则包括快照和操作日志），文件不存在时对应项为空元组"""
+        files = [self.rules_file, self.rules_journal_file] if kind == "rules" else [self.users_file]
+        stamp = []
+        for filepath in files:
+            try:
+                st = os.stat(filepath)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(())
+        return tuple(stamp)
+
+    # ========== 推理历史 ==========
+
+    def _read_history_log(self) -> list:
+        """读取历史日志，跳过无法解析的行（如写入中断留下的半行）"""
+        history = []
+        if not os.path.exists(self.history_file):
+            return history
+        with open(self.history_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    history.append(json.loads(line))
+                except ValueError:
+                    pass
+        return history
+
+    def _write_history_log(self, history: list):
+        """整体重写历史日志：先写临时文件再替换，替换前的旧日志保持完整"""
+        history = history[-HISTORY_LIMIT:]
+        atomic_write_text(
+            self.history_file,
+            "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in history),
+        )
+        self._history_lines = len(history)
+
+    def _prepare_history(self):
+        """首次访问时迁移旧版历史文件并统计日志行数，调用方需持有锁"""
+        if self._history_lines is not None:
+            return
+        if not os.path.exists(self.history_file):
+            try:
+                legacy = read_json(self.legacy_history_file, {"history": []})
+            except ValueError:
+                # 旧版历史文件损坏时从空日志开始，旧文件保留不动
+                legacy = {"history": []}
+            self._write_history_log(legacy.get("history", []))
+            return
+        with open(self.history_file, "rb") as f:
+            data = f.read()
+        self._history_lines = data.count(b"\n")
+        if data and not data.endswith(b"\n"):
+            # 补全中断写入留下的半行，避免与下一条记录连在一起
+            with open(self.history_file, "ab") as f:
+                f.write(b"\n")
+            self._history_lines += 1
+
+    def load_history(self) -> list:
+        with file_lock(self.history_file):
+            self._prepare_history()
+            return self._read_history_log()[-HISTORY_LIMIT:]
+
+    def save_history(self, history: list):
+        with file_lock(self.history_file):
+            self._prepare_history()
+            self._write_history_log(history)
+
+    def add_history(self, record: dict):
+        """只向日志追加一行，行数过多时启动后台压缩"""
+        self.add_history_batch([record])
+
+    def add_history_batch(self, records: list):
+        """一次追加多行"""
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with file_lock(self.history_file):
+            self._prepare_history()
+            with open(self.history_file, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self._history_lines += len(records)
+            if self._history_lines <= _COMPACT_THRESHOLD or self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self.compact_history, daemon=True).start()
+
+    def delete_history(self, history_id: str, username: str | None = None) -> bool:
+        """读取、过滤、写回期间持有文件锁，其间追加的记录不会被覆盖"""
+        with file_lock(self.history_file):
+            return super().delete_history(history_id, username)
+
+    def clear_history(self, username: str | None = None):
+        with file_lock(self.history_file):
+            super().clear_history(username)
+
+    def compact_history(self):
+        """压缩历史日志，只保留最近的记录"""
+        try:
+            with file_lock(self.history_file):
+                self._prepare_history()
+                self._write_history_log(self._read_history_log())
+        finally:
+            self._compacting = False
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    position INTEGER NOT NULL,
+    premises TEXT NOT NULL,
+    conclusion TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rules_position ON rules (position);
+CREATE TABLE IF NOT EXISTS users (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT,
+    username TEXT,
+    timestamp TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_user_time ON history (username, timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_time ON history (timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_id ON history (id);
+"""
+
+
+class SqliteBackend(StorageBackend):
+    """
+    SQLite 后端，数据库文件为 expert_system.db
+    - rules: 规则以自增 id 为稳定标识，position 为在规则库中的顺序；整体保存时内容不变的规则保留原 id，
+      添加、修改、删除单条规则只改动一行
+    - users: 以用户名为主键
+    - history: 以插入序号为主键，按 (username, timestamp) 建索引
+    数据库首次创建时导入同目录下已有的 JSON 数据文件
+    """
+
+    def __init__(self, base_path: str):
+        self.db_file = os.path.join(base_path, "expert_system.db")
+        is_new = not os.path.exists(self.db_file)
+        # Web 服务器在多个线程中处理请求，共用一个连接并用锁串行化
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+        if is_new:
+            self._import_json(JsonBackend(base_path))
+
+    def _import_json(self, source: JsonBackend):
+        """从 JSON 文件后端导入已有数据"""
+        rules = source.load_rules()
+        if rules:
+            self.save_rules(rules)
+        users = source.load_users()
+        if users.get("users"):
+            self.save_users(users)
+        if os.path.exists(source.history_file):
+            history = source.load_history()
+        else:
+            # 只有旧版历史文件时直接读取，不在原目录生成 JSONL 日志
+            history = read_json(source.legacy_history_file, {"history": []}).get("history", [])
+        if history:
+            self.save_history(history)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    # ========== 规则 ==========
+
+    def load_rules(self) -> list[tuple[list[str], str]]:
+        return self.load_rule_table()[1]
+
+    def load_rule_table(self) -> tuple[list[int], list[tuple[list[str], str]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, premises, conclusion FROM rules ORDER BY position"
+            ).fetchall()
+        return [row[0] for row in rows], [(json.loads(premises), ans) for _, premises, ans in rows]
+
+    def save_rules(self, rules: list[tuple[list[str], str]]):
+        with self._lock, self._conn:
+            existing = [
+                (rule_id, (json.loads(premises), conclusion))
+                for rule_id, premises, conclusion in self._conn.execute(
+                    "SELECT id, premises, conclusion FROM rules ORDER BY position"
+                )
+            ]
+            kept, added, removed = _match_rule_ids(existing, rules)
+            self._conn.executemany("DELETE FROM rules WHERE id = ?", [(r,) for r in removed])
+            self._conn.executemany("UPDATE rules SET position = ? WHERE id = ?", kept)
+            self._conn.executemany(
+                "INSERT INTO rules (position, premises, conclusion) VALUES (?, ?, ?)",
+                [
+                    (position, json.dumps(list(rules[position][0]), ensure_ascii=False), rules[position][1])
+                    for position in added
+                ],
+            )
+
+    def add_rule(self, premises: list[str], conclusion: str) -> int:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO rules (position, premises, conclusion) "
+                "VALUES ((SELECT COALESCE(MAX(position), -1) + 1 FROM rules), ?, ?)",
+                (json.dumps(list(premises), ensure_ascii=False), conclusion),
+            )
+            return cursor.lastrowid
+
+    def update_rule(self, rule_id: int, premises: list[str], conclusion: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE rules SET premises = ?, conclusion = ? WHERE id = ?",
+                (json.dumps(list(premises), ensure_ascii=False), conclusion, rule_id),
+            )
+
+    def delete_rule(self, rule_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rules WHERE id = ?", (rule_id,))
+
+    # ========== 用户 ==========
+
+    def load_users(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT name, data FROM users").fetchall()
+        return {"users": {name: json.loads(data) for name, data in rows}}
+
+    def _write_users(self, users: dict):
+        """写入用户表，调用方需持有锁并处于事务中"""
+        names = [(name,) for (name,) in self._conn.execute("SELECT name FROM users")]
+        self._conn.executemany(
+            "DELETE FROM users WHERE name = ?", [n for n in names if n[0] not in users]
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO users (name, data) VALUES (?, ?)",
+            [(name, json.dumps(info, ensure_ascii=False)) for name, info in users.items()],
+        )
+
+    def save_users(self, data: dict):
+        with self._lock, self._conn:
+            self._write_users(data.get("users", {}))
+
+    def update_users(self, update):
+        """在一个写事务（BEGIN IMMEDIATE，其他连接不能同时写入）中读取、修改并写入"""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute("SELECT name, data FROM users").fetchall()
+            data = {"users": {name: json.loads(info) for name, info in rows}}
+            before = copy.deepcopy(data)
+            result = update(data)
+            if data != before:
+                self._write_users(data.get("users", {}))
+            return result
+
+    def data_stamp(self, kind: str):
+        """数据库的 data_version，其他连接提交修改后改变（本连接的修改由调用方自行记录）"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    # ========== 推理历史 ==========
+
+    @staticmethod
+    def _history_row(record: dict) -> tuple:
+        return (
+            record.get("id"),
+            record.get("username"),
+            record.get("timestamp"),
+            json.dumps(record, ensure_ascii=False),
+        )
+
+    def _trim_history(self):
+        """只保留最近的记录，调用方需持有锁并处于事务中"""
+        self._conn.execute(
+            "DELETE FROM history WHERE seq <= "
+            "(SELECT seq FROM history ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+            (HISTORY_LIMIT,),
+        )
+
+    def load_history(self) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT record FROM history ORDER BY seq").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def save_history(self, history: list):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM history")
+            self._conn.executemany(
+                "INSERT INTO history (id, username, timestamp, record) VALUES (?, ?, ?, ?)",
+                [self._history_row(record) for record in history[-HISTORY_LIMIT:]],
+            )
+
+    def add_history(self, record: dict):
+        self.add_history_batch([record])
+
+    def add_history_batch(self, records: list):
+        """多条记录在一个事务中写入"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO history (id, username, timestamp, record) VALUES (?, ?, ?, ?)",
+                [self._history_row(record) for record in records],
+            )
+            self._trim_history()
+
+    def history_fact_counts(self) -> tuple[dict[str, int], int]:
+        """在数据库中聚合，不读出历史记录"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT facts.value, COUNT(DISTINCT history.seq) "
+                "FROM history, json_each(history.record, '$.facts') AS facts "
+                "GROUP BY facts.value"
+            ).fetchall()
+            total = self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        return dict(rows), total
+
+    def query_history(
+        self, username: str | None = None, offset: int = 0, limit: int | None = None
+    ) -> tuple[list, int]:
+        where, args = ("WHERE username = ?", (username,)) if username is not None else ("", ())
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM history {where}", args).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT record FROM history {where} "
+                "ORDER BY timestamp DESC, seq DESC LIMIT ? OFFSET ?",
+                args + (-1 if limit is None else limit, offset),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows], total
+
+    def delete_history(self, history_id: str, username: str | None = None) -> bool:
+        sql, args = "DELETE FROM history WHERE id = ?", (history_id,)
+        if username is not None:
+            sql, args = sql + " AND username = ?", args + (username,)
+        with self._lock, self._conn:
+            return self._conn.execute(sql, args).rowcount > 0
+
+    def clear_history(self, username: str | None = None):
+        with self._lock, self._conn:
+            if username is None:
+                self._conn.execute("DELETE FROM history")
+            else:
+                self._conn.execute("DELETE FROM history WHERE username = ?", (username,))
@@ -0,0 +1,177 @@
+"""
+数据文件的安全读写
+- 原子写入：先写同目录下的临时文件并落盘，再替换目标文件，中断时目标文件保持旧内容
+- 文件锁：同一路径在进程内用可重入锁互斥，进程间用旁路的 .lock 文件加建议锁
+- 合并写入：同一文件排队等待的多次整体写入只写最新的一份
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class _PathLock:
+    """单个路径的锁：进程内可重入，最外层持有时同时持有进程间的文件锁"""
+
+    def __init__(self, path: str):
+        self.lock_file = path + ".lock"
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd: int | None = None
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+                else:
+                    while True:
+                        try:
+                            msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                            break
+                        except OSError:
+                            time.sleep(0.01)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._lock.release()
+
+
+_locks: dict[str, _PathLock] = {}
+_locks_guard = threading.Lock()
+
+
+def _path_lock(path: str) -> _PathLock:
+    path = os.path.abspath(path)
+    with _locks_guard:
+        if path not in _locks:
+            _locks[path] = _PathLock(path)
+        return _locks[path]
+
+
+@contextmanager
+def file_lock(path: str):
+    """持有 path 的互斥锁（进程内和进程间），可嵌套"""
+    lock = _path_lock(path)
+    lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def atomic_write_text(path: str, text: str):
+    """原子地写入文本：临时文件写完并落盘后替换目标文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_file = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+class _CoalescingWriter:
+    """
+    同一文件的整体写入：写入进行中时到达的请求只保留最新的一份，
+    当前写入结束后由一个等待者写入最新数据，被合并的请求随之返回
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._cond = threading.Condition()
+        self._pending = None  # 等待写入的最新数据
+        self._requested = 0  # 最新请求的序号
+        self._written = 0  # 已写入的最新请求序号
+        self._writing = False
+
+    def write(self, data, serialize):
+        with self._cond:
+            self._requested += 1
+            ticket = self._requested
+            self._pending = data
+            while self._written < ticket:
+                if self._writing:
+                    self._cond.wait()
+                    continue
+                data, target = self._pending, self._requested
+                self._pending = None
+                self._writing = True
+                self._cond.release()
+                try:
+                    with file_lock(self.path):
+                        atomic_write_text(self.path, serialize(data))
+                except BaseException:
+                    self._cond.acquire()
+                    # 写入失败：没有更新的数据时放回，交给其他等待者重试
+                    if self._pending is None and self._requested == target:
+                        self._pending = data
+                    self._writing = False
+                    self._cond.notify_all()
+                    raise
+                self._cond.acquire()
+                self._writing = False
+                self._written = target
+                self._cond.notify_all()
+
+
+_writers: dict[str, _CoalescingWriter] = {}
+
+
+def write_json(path: str, data):
+    """原子地写入 JSON 文件，并发写入同一文件时合并为最新的一份"""
+    path = os.path.abspath(path)
+    with _locks_guard:
+        if path not in _writers:
+            _writers[path] = _CoalescingWriter(path)
+        writer = _writers[path]
+    writer.write(data, lambda d: json.dumps(d, ensure_ascii=False, indent=4))
+
+
+def read_json(path: str, default):
+    """
+    读取 JSON 文件，文件不存在时返回 default
+    文件内容无法解析时抛出 ValueError，不把损坏的文件当作空数据
+    """
+    with file_lock(path):
+        if not os.path.exists(path):
+            return default
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"数据文件已损坏: {path}（{e}）") from e
@@ -1,12 +1,26 @@
 """数据存储管理"""
 
-import json
+import atexit
+import copy
 import os
+import queue
 import sys
+import threading
+import time
+import traceback
 from datetime import datetime
 
+from .backends import HISTORY_LIMIT, JsonBackend, SqliteBackend, StorageBackend
 from .constants import DEFAULT_RULES
 
+# 可选的存储后端
+BACKENDS: tuple[str, ...] = ("json", "sqlite")
+
+# 历史写入队列的容量，队列满时添加记录会等待后台写入
+HISTORY_QUEUE_SIZE = 10000
+# 后台写入每批最多的记录数
+_HISTORY_BATCH = 500
+
 
 def _get_base_path() -> str:
     """获取数据文件基础路径"""
@@ -15,83 +29,306 @@ def _get_base_path() -> str:
     return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
+def _ensure_admin(data: dict):
+    """确保有默认管理员"""
+    users = data.setdefault("users", {})
+    if "admin" not in users:
+        users["admin"] = {
+            "password": "admin123",
+            "role": "admin",
+            "created_at": datetime.now().isoformat(),
+        }
+
+
 class DataStorage:
-    """统一的数据存储管理类"""
+    """
+    统一的数据存储管理类
+    读写由存储后端完成：backend 为 "json"（默认）、"sqlite"，或 StorageBackend 实例
+    """
 
-    def __init__(self, base_path: str | None = None):
+    def __init__(self, base_path: str | None = None, backend: str | StorageBackend = "json"):
         self.base_path = base_path or _get_base_path()
-        self.rules_file = os.path.join(self.base_path, "rules.json")
-        self.users_file = os.path.join(self.base_path, "users.json")
-        self.history_file = os.path.join(self.base_path, "inference_history.json")
+        if isinstance(backend, StorageBackend):
+            self.backend = backend
+        elif backend == "json":
+            self.backend = JsonBackend(self.base_path)
+        elif backend == "sqlite":
+            self.backend = SqliteBackend(self.base_path)
+        else:
+            raise ValueError(f"未知的存储后端: {backend}，可选: {', '.join(BACKENDS)}")
 
-    def _load_json(self, filepath: str, default=None):
-        """加载 JSON 文件"""
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                pass
-        return default if default is not None else {}
+        # 规则和用户数据的内存缓存：kind → (版本, 外部修改标记, 数据)
+        # 本进程每次写入使版本加一，其他进程的修改由后端的 data_stamp 发现
+        self._cache: dict[str, tuple[int, object, object]] = {}
+        self._cache_lock = threading.Lock()
+        self._version = 0
+
+        # 历史记录先进入有界队列，由后台线程成批写入后端（首次添加记录时启动）
+        # 队列项为 (入队时间, 记录)，None 表示停止
+        self._history_queue: queue.Queue = queue.Queue(HISTORY_QUEUE_SIZE)
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+        self._atexit_registered = False  # close() 后重启写入线程时不重复注册退出钩子
+        self._written = 0  # 已写入的记录数
+        # 已入队和已处理（写入或丢弃）的记录数，flush_history 只等待调用时已入队的记录
+        self._history_cond = threading.Condition()
+        self._enqueued = 0
+        self._processed = 0
+        self._last_lag = 0.0  # 最近一批中最早记录从入队到写入的秒数
+
+    # ========== 规则 / 用户缓存 ==========
+    # 缓存中的数据不直接交给调用方，调用方会修改加载结果后再保存
+
+    @property
+    def version(self) -> int:
+        """本进程写入规则或用户数据的次数"""
+        return self._version
+
+    def _load_cached(self, kind: str, load):
+        """缓存有效时返回缓存的数据，否则调用 load 读取并缓存，调用方需持有锁"""
+        stamp = self.backend.data_stamp(kind)
+        entry = self._cache.get(kind)
+        if stamp is not None and entry is not None and entry[:2] == (self._version, stamp):
+            return entry[2]
+        data = load()
+        if stamp is not None:
+            self._cache[kind] = (self._version, stamp, data)
+        return data
 
-    def _save_json(self, filepath: str, data):
-        """保存 JSON 文件"""
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+    def _cached(self, kind: str, load):
+        with self._cache_lock:
+            return self._load_cached(kind, load)
+
+    def _written_data(self, kind: str, data):
+        """写入后版本加一，并以写入后的标记缓存 data（None 表示不缓存），调用方需持有锁"""
+        self._version += 1
+        stamp = self.backend.data_stamp(kind)
+        if stamp is not None and data is not None:
+            self._cache[kind] = (self._version, stamp, data)
+        else:
+            self._cache.pop(kind, None)
+
+    def _invalidate(self, kind: str):
+        """本进程写入后版本加一，丢弃缓存"""
+        with self._cache_lock:
+            self._version += 1
+            self._cache.pop(kind, None)
+
+    def _write(self, kind: str, save, data):
+        """调用 save(data) 写入；写入时不持有缓存锁，并发的整体写入可在后端合并"""
+        try:
+            save(data)
+        finally:
+            self._invalidate(kind)
 
     # ========== 规则管理 ==========
+    # 规则在缓存中为 (稳定 id 列表, 规则列表)；对外的规则下标为在规则库中的位置
 
     def load_rules(self) -> list[tuple[list[str], str]]:
         """加载规则"""
-        data = self._load_json(self.rules_file, {"rules": []})
-        rules = data.get("rules", [])
+        _, rules = self._cached("rules", self.backend.load_rule_table)
         if not rules:
-            rules = [[list(pres), ans] for pres, ans in DEFAULT_RULES]
-            self.save_rules([(pres, ans) for pres, ans in rules])
-        return [(pres, ans) for pres, ans in rules]
+            rules = [(list(pres), ans) for pres, ans in DEFAULT_RULES]
+            self.save_rules(rules)
+        return [(list(pres), ans) for pres, ans in rules]
+
+    def load_rule_ids(self) -> list[int]:
+        """各规则的稳定 id，顺序与 load_rules 一致"""
+        ids, _ = self._cached("rules", self.backend.load_rule_table)
+        return list(ids)
 
     def save_rules(self, rules: list[tuple[list[str], str]]):
-        """保存规则"""
-        self._save_json(
-            self.rules_file, {"rules": [[pres, ans] for pres, ans in rules]}
-        )
+        """整体保存规则"""
+        self._write("rules", self.backend.save_rules, [(list(pres), ans) for pres, ans in rules])
+
+    def _change_rules(self, change):
+        """对规则表做单条修改：change(ids, rules) 写入后端并就地修改缓存的规则表"""
+        with self._cache_lock:
+            ids, rules = self._load_cached("rules", self.backend.load_rule_table)
+            result = change(ids, rules)
+            self._written_data("rules", (ids, rules))
+            return result
+
+    def add_rule(self, premises: list[str], conclusion: str) -> int:
+        """在末尾添加一条规则，返回其下标"""
+
+        def change(ids, rules):
+            ids.append(self.backend.add_rule(premises, conclusion))
+            rules.append((list(premises), conclusion))
+            return len(rules) - 1
+
+        return self._change_rules(change)
+
+    def update_rule(self, index: int, premises: list[str], conclusion: str):
+        """修改下标为 index 的规则，下标越界时抛出 IndexError"""
+
+        def change(ids, rules):
+            if not 0 <= index < len(rules):
+                raise IndexError("规则不存在")
+            self.backend.update_rule(ids[index], premises, conclusion)
+            rules[index] = (list(premises), conclusion)
+
+        self._change_rules(change)
+
+    def delete_rule(self, index: int):
+        """删除下标为 index 的规则，下标越界时抛出 IndexError"""
+
+        def change(ids, rules):
+            if not 0 <= index < len(rules):
+                raise IndexError("规则不存在")
+            self.backend.delete_rule(ids[index])
+            del ids[index]
+            del rules[index]
+
+        self._change_rules(change)
 
     # ========== 用户管理 ==========
 
     def load_users(self) -> dict:
         """加载用户数据"""
-        data = self._load_json(self.users_file, {"users": {}})
+        data = self._cached("users", self.backend.load_users)
         # 确保有默认管理员
         if "admin" not in data.get("users", {}):
-            data["users"] = data.get("users", {})
-            data["users"]["admin"] = {
-                "password": "admin123",
-                "role": "admin",
-                "created_at": datetime.now().isoformat(),
-            }
-            self._save_json(self.users_file, data)
-        return data
+            self.update_users(_ensure_admin)
+            data = self._cached("users", self.backend.load_users)
+        return copy.deepcopy(data)
 
     def save_users(self, data: dict):
-        """保存用户数据"""
-        self._save_json(self.users_file, data)
+        """整体保存用户数据"""
+        self._write("users", self.backend.save_users, copy.deepcopy(data))
+
+    def update_users(self, update):
+        """
+        原子地读取-修改-保存用户数据，用于注册、修改角色等只改动部分用户的操作
+        update(data) 就地修改 data 并返回结果，data 未被修改时不写入；返回 update 的返回值
+        """
+
+        def apply(data):
+            _ensure_admin(data)
+            return update(data)
+
+        try:
+            return self.backend.update_users(apply)
+        finally:
+            self._invalidate("users")
 
     # ========== 历史记录管理 ==========
+    # 读取、修改历史前先等待队列中的记录写入，保证能读到刚添加的记录
 
     def load_history(self) -> list:
-        """加载推理历史"""
-        data = self._load_json(self.history_file, {"history": []})
-        return data.get("history", [])
+        """加载推理历史（最近 HISTORY_LIMIT 条）"""
+        self.flush_history()
+        return self.backend.load_history()
 
     def save_history(self, history: list):
-        """保存推理历史"""
-        # 只保留最近1000条
-        if len(history) > 1000:
-            history = history[-1000:]
-        self._save_json(self.history_file, {"history": history})
+        """保存推理历史，只保留最近 HISTORY_LIMIT 条"""
+        self.flush_history()
+        self.backend.save_history(history[-HISTORY_LIMIT:])
 
     def add_history(self, record: dict):
-        """添加历史记录"""
-        history = self.load_history()
-        history.append(record)
-        self.save_history(history)
+        """添加历史记录：放入写入队列后立即返回，队列满时等待"""
+        self._start_writer()
+        with self._history_cond:
+            self._enqueued += 1
+        self._history_queue.put((time.monotonic(), record))
+
+    def history_fact_counts(self) -> tuple[dict[str, int], int]:
+        """
+        返回 (事实 → 将其确认为真的历史记录数, 历史记录总数)，用于估计回答频率
+        只是统计，不等待写入队列，队列中的记录在下次统计时计入
+        """
+        return self.backend.history_fact_counts()
+
+    def query_history(
+        self, username: str | None = None, offset: int = 0, limit: int | None = None
+    ) -> tuple[list, int]:
+        """按时间倒序分页查询历史，返回 (本页记录, 总数)；username 为 None 时查询所有用户"""
+        self.flush_history()
+        return self.backend.query_history(username, offset, limit)
+
+    def delete_history(self, history_id: str, username: str | None = None) -> bool:
+        """删除一条历史记录，username 不为 None 时只能删除该用户的记录"""
+        self.flush_history()
+        return self.backend.delete_history(history_id, username)
+
+    def clear_history(self, username: str | None = None):
+        """清空历史，username 不为 None 时只清空该用户的记录"""
+        self.flush_history()
+        self.backend.clear_history(username)
+
+    # ========== 历史写入队列 ==========
+
+    def _start_writer(self):
+        """启动后台写入线程，进程退出时写完队列中的记录"""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_history_loop, daemon=True)
+                self._writer.start()
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+
+    def _write_history_loop(self):
+        """后台线程：取出队列中已有的记录成批写入（组提交）"""
+        while True:
+            items = [self._history_queue.get()]
+            while items[-1] is not None and len(items) < _HISTORY_BATCH:
+                try:
+                    items.append(self._history_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = items[-1] is None
+            batch = [item for item in items if item is not None]
+            try:
+                if batch:
+                    self.backend.add_history_batch([record for _, record in batch])
+                    self._written += len(batch)
+                    self._last_lag = time.monotonic() - batch[0][0]
+            except Exception:
+                # 写入失败的记录丢弃，不影响后续记录
+                traceback.print_exc()
+            finally:
+                with self._history_cond:
+                    self._processed += len(batch)
+                    self._history_cond.notify_all()
+            if stop:
+                return
+
+    def flush_history(self):
+        """
+        等待调用时已入队的记录写入；之后持续到达的记录不会延长等待
+        后台写入线程已停止时不等待
+        """
+        with self._history_cond:
+            target = self._enqueued
+            while self._processed < target:
+                writer = self._writer
+                if writer is None or not writer.is_alive():
+                    return
+                self._history_cond.wait(0.1)
+
+    def history_queue_stats(self) -> dict:
+        """
+        写入队列状态
+        - depth: 等待写入的记录数
+        - lag: 队列中最早的记录已等待的秒数，队列为空时为 0
+        - last_lag: 最近一批写入时，其中最早的记录从入队到写入的秒数
+        - written: 已写入的记录数
+        """
+        with self._history_queue.mutex:
+            pending = [item for item in self._history_queue.queue if item is not None]
+            oldest = pending[0][0] if pending else None
+        return {
+            "depth": len(pending),
+            "lag": time.monotonic() - oldest if oldest is not None else 0.0,
+            "last_lag": self._last_lag,
+            "written": self._written,
+        }
+
+    def close(self):
+        """写完队列中的记录并停止后台写入线程"""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None and writer.is_alive():
+            self._history_queue.put(None)
+            writer.join()
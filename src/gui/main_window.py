@@ -403,30 +403,42 @@ class ExpertSystemGUI(QMainWindow):
         )
         if dialog.exec() == QDialog.DialogCode.Accepted:
             selected_facts = dialog.get_selected_facts()
-            # 如果移除了事实，需要重置推理状态
-            if set(self.known_facts[0]) - set(selected_facts):
-                self.path_all = []
-                self.known_facts[1].clear()
-                self.backward_in_progress = False
+            # 如果移除了事实，只撤回受影响的推导结果
+            removed_facts = set(self.known_facts[0]) - set(selected_facts)
             self.known_facts[0] = selected_facts
-            # 重新同步推理器状态（先清空再添加）
-            self._sync_reasoner_facts()
+            if removed_facts:
+                self._retract_known_facts(removed_facts)
+                self.backward_in_progress = False
+            self.reasoner.add_known(selected_facts)
             self._refresh_facts_display()
 
     def _remove_known_fact(self, item: QListWidgetItem):
         fact = item.text()
         if fact in self.known_facts[0]:
             self.known_facts[0].remove(fact)
-            self.known_facts[1].clear()
-            self._sync_reasoner_facts()
+            self._retract_known_facts({fact})
             self._refresh_facts_display()
-            self.path_all.clear()
+
+    def _retract_known_facts(self, facts: set[str]):
+        """撤回事实，同步移除失去支持的推导事实和推理路径"""
+        removed, rederived = self.reasoner.retract(list(facts))
+        gone = set(removed)
+        self.path_all = [
+            r
+            for r in self.path_all
+            if r < len(self.rules)
+            and self.rules[r][1] not in gone
+            and not gone.intersection(self.rules[r][0])
+        ]
+        self.known_facts[1] = [f for f in self.known_facts[1] if f not in gone]
+        self._update_known_facts_from_path(rederived)
 
     def _remove_false_fact(self, item: QListWidgetItem):
         fact = item.text()
         if fact in self.false_facts:
             self.false_facts.remove(fact)
-            self._sync_reasoner_facts()
+            self.reasoner.clear_false()
+            self.reasoner.add_false(self.false_facts)
             self._refresh_facts_display()
 
     def _clear_facts(self):
@@ -455,13 +467,14 @@ class ExpertSystemGUI(QMainWindow):
             QMessageBox.warning(self, "提示", "请先添加一些已知事实！")
             return
 
-        conclusions, path = self.reasoner.find()
+        # 按规则顺序消解冲突，结论依触发顺序排列，第一个即优先级最高
+        conclusions, path = self.reasoner.find_agenda("order", stop_on_terminal=False)
 
         if len(conclusions) > 1:
             result_msg = "发现多个可能的结论（冲突消解）:\n\n"
             for i, conc in enumerate(conclusions):
                 result_msg += f"{i + 1}. {conc}\n"
-            result_msg += f"\n采用结论: {conclusions[0]} (优先级最高)"
+            result_msg += f"\n采用结论: {conclusions[0]} (按规则顺序优先级最高)"
             final_conclusion = conclusions[0]
         elif conclusions:
             result_msg = f"推理成功！\n\n结论: {conclusions[0]}"
@@ -490,11 +503,12 @@ class ExpertSystemGUI(QMainWindow):
         self.backward_target = target
         self.backward_in_progress = True
 
-        while self.backward_in_progress:
-            status, data, path = self.reasoner.step_backward(self.backward_target)
-            self._update_known_facts_from_path(path)
+        # 逐步消费反向推理事件，得证的事实即时加入推导事实
+        for event in self.reasoner.iter_backward(self.backward_target):
+            if event[0] == "rule":
+                self._update_known_facts_from_path([event[1]])
 
-            if status == 0:  # 成功
+            elif event[0] == "done" and event[1]:  # 成功
                 self.backward_in_progress = False
                 result_msg = (
                     f"反向推理成功！\n\n目标 '{self.backward_target}' 已证明成立。"
@@ -509,7 +523,7 @@ class ExpertSystemGUI(QMainWindow):
                 )
                 QMessageBox.information(self, "成功", result_msg)
 
-            elif status == 1:  # 失败
+            elif event[0] == "done":  # 失败
                 self.backward_in_progress = False
                 result_msg = (
                     f"反向推理失败。\n\n无法证明目标 '{self.backward_target}' 成立。"
@@ -520,7 +534,8 @@ class ExpertSystemGUI(QMainWindow):
                 )
                 QMessageBox.warning(self, "失败", result_msg)
 
-            elif status == 2:  # 需要询问
+            elif event[0] == "ask":  # 需要询问
+                data = event[1]
                 dialog = FactQueryDialog(
                     [d for d in data if d not in self.known_facts[0]], self
                 )
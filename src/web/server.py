@@ -1,16 +1,22 @@
 """专家系统 Web 服务器"""
 
+import math
 import os
 import sys
+import time
 import uuid
 from datetime import datetime
 from functools import wraps
-from threading import Thread
+from threading import Lock, Thread
 
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
 
 from src.core import RuleReasoner
+from src.core.agenda import STRATEGIES
+from src.core.budget import Budget
+from src.core.proof import BackwardProof
+from src.core.planner import frequencies_from_counts
 from src.data import DataStorage
 
 # 确定静态文件路径
@@ -46,6 +52,58 @@ storage = DataStorage()
 # 会话管理
 sessions: dict = {}
 
+# 单次推理调用的预算，超时须小于前端 axios 的 30 秒超时
+INFERENCE_TIMEOUT = 10.0
+INFERENCE_MAX_RULES = 1_000_000
+
+
+def _inference_budget() -> Budget:
+    return Budget(max_rules=INFERENCE_MAX_RULES, timeout=INFERENCE_TIMEOUT)
+
+
+# 决策树在规则加载后由后台线程预编译，请求中不编译；单个目标的编译时间上限（秒）
+TREE_COMPILE_TIMEOUT = 5.0
+_tree_generation = 0  # 规则变化的次数，规则再次变化时正在进行的预编译停止
+
+
+def _compile_decision_trees(generation: int):
+    """为当前规则库的所有结论编译决策树，结果按规则库哈希在所有会话间共享"""
+    rules = storage.load_rules()
+    reasoner = RuleReasoner()
+    reasoner.reset(rules)
+    for target in dict.fromkeys(ans for _, ans in rules):
+        if generation != _tree_generation:
+            return
+        try:
+            reasoner.decision_tree(target, Budget(timeout=TREE_COMPILE_TIMEOUT))
+        except ValueError:
+            # 失败原因已记录在共享缓存中，请求时退回逐步反向推理
+            pass
+
+
+def _start_tree_compilation():
+    """规则加载或变化后启动决策树预编译"""
+    global _tree_generation
+    _tree_generation += 1
+    Thread(target=_compile_decision_trees, args=(_tree_generation,), daemon=True).start()
+
+
+# 反向推理规划使用的历史回答频率在所有会话间共享，最多每 ANSWER_FREQ_TTL 秒重新统计一次
+ANSWER_FREQ_TTL = 300.0
+_answer_freq: tuple[float, tuple[dict, float]] | None = None  # (统计时间, (频率, 默认频率))
+_answer_freq_lock = Lock()
+
+
+def _answer_frequencies() -> tuple[dict, float]:
+    """返回 (原子事实 → 回答为真的频率, 未出现在历史中的事实的频率)"""
+    global _answer_freq
+    with _answer_freq_lock:
+        now = time.monotonic()
+        if _answer_freq is None or now - _answer_freq[0] >= ANSWER_FREQ_TTL:
+            counts, total = storage.history_fact_counts()
+            _answer_freq = (now, frequencies_from_counts(counts, total))
+        return _answer_freq[1]
+
 
 def get_session(token: str):
     return sessions.get(token)
@@ -83,7 +141,9 @@ class ReasonerSession:
     """每个用户会话的推理器状态"""
 
     def __init__(self):
-        self.reasoner = RuleReasoner()
+        # 反向推理按代价规划尝试规则和前提，前提成立概率取自历史回答频率
+        self.reasoner = RuleReasoner(backward_order="cost")
+        self.reasoner.set_answer_frequencies(*_answer_frequencies())
         self.rules = storage.load_rules()
         self.reasoner.reset(self.rules)
         self.known_facts = [[], []]
@@ -91,6 +151,9 @@ class ReasonerSession:
         self.path_all = []
         self.backward_target = None
         self.backward_in_progress = False
+        self.backward_mode = "stack"  # "stack" 逐步反向推理，"tree" 按预编译决策树提问
+        # 逐步反向推理的可序列化状态（BackwardProof.to_dict()），按代价规划的顺序尝试规则
+        self.backward_proof: dict | None = None
 
     def reset_state(self):
         self.reasoner.clear_known()
@@ -100,10 +163,20 @@ class ReasonerSession:
         self.path_all = []
         self.backward_target = None
         self.backward_in_progress = False
+        self.backward_proof = None
 
     def reload_rules(self):
         self.rules = storage.load_rules()
         self.reasoner.reset(self.rules)
+        # 推理状态绑定规则库哈希，规则变化后从当前事实重新开始
+        self.backward_proof = None
+
+    def facts_changed(self):
+        """
+        已知/假事实在逐步反向推理之外改变（设置事实、正向推理、多目标推理）后调用
+        保存的推理状态只带有创建时的事实，丢弃后下次继续时从推理器当前的事实重新开始
+        """
+        self.backward_proof = None
 
     def get_all_atoms(self) -> set:
         atoms, conclusions = set(), set()
@@ -127,6 +200,7 @@ def _reload_all_reasoner_sessions():
     for session in sessions.values():
         if "reasoner_session" in session:
             session["reasoner_session"].reload_rules()
+    _start_tree_compilation()
 
 
 # ========== 路由 ==========
@@ -188,16 +262,19 @@ def register():
     if not username or not password:
         return jsonify({"error": "用户名和密码不能为空"}), 400
 
-    users_data = storage.load_users()
-    if username in users_data.get("users", {}):
-        return jsonify({"error": "用户名已存在"}), 400
+    def register_user(users_data: dict) -> bool:
+        if username in users_data["users"]:
+            return False
+        users_data["users"][username] = {
+            "password": password,
+            "role": "user",
+            "created_at": datetime.now().isoformat(),
+        }
+        return True
 
-    users_data["users"][username] = {
-        "password": password,
-        "role": "user",
-        "created_at": datetime.now().isoformat(),
-    }
-    storage.save_users(users_data)
+    # 检查用户名和写入在同一次原子更新中完成，并发注册不会互相覆盖
+    if not storage.update_users(register_user):
+        return jsonify({"error": "用户名已存在"}), 400
     return jsonify({"message": "注册成功"})
 
 
@@ -243,12 +320,10 @@ def add_rule():
     if not premises or not conclusion:
         return jsonify({"error": "前提和结论不能为空"}), 400
 
-    rules = storage.load_rules()
-    rules.append((premises, conclusion))
-    storage.save_rules(rules)
+    rule_id = storage.add_rule(premises, conclusion)
     _reload_all_reasoner_sessions()
 
-    return jsonify({"message": "规则添加成功", "id": len(rules) - 1})
+    return jsonify({"message": "规则添加成功", "id": rule_id})
 
 
 @app.route("/api/rules/batch", methods=["POST"])
@@ -261,16 +336,14 @@ def batch_add_rules():
     if not new_rules:
         return jsonify({"error": "规则列表不能为空"}), 400
 
-    rules = storage.load_rules()
     added_count = 0
     for rule in new_rules:
         premises = rule.get("premises", [])
         conclusion = rule.get("conclusion", "")
         if premises and conclusion:
-            rules.append((premises, conclusion))
+            storage.add_rule(premises, conclusion)
             added_count += 1
 
-    storage.save_rules(rules)
     _reload_all_reasoner_sessions()
 
     return jsonify({"message": f"成功添加 {added_count} 条规则"})
@@ -286,12 +359,10 @@ def update_rule(rule_id):
     if not premises or not conclusion:
         return jsonify({"error": "前提和结论不能为空"}), 400
 
-    rules = storage.load_rules()
-    if rule_id < 0 or rule_id >= len(rules):
+    try:
+        storage.update_rule(rule_id, premises, conclusion)
+    except IndexError:
         return jsonify({"error": "规则不存在"}), 404
-
-    rules[rule_id] = (premises, conclusion)
-    storage.save_rules(rules)
     _reload_all_reasoner_sessions()
 
     return jsonify({"message": "规则更新成功"})
@@ -300,12 +371,10 @@ def update_rule(rule_id):
 @app.route("/api/rules/<int:rule_id>", methods=["DELETE"])
 @require_admin
 def delete_rule(rule_id):
-    rules = storage.load_rules()
-    if rule_id < 0 or rule_id >= len(rules):
+    try:
+        storage.delete_rule(rule_id)
+    except IndexError:
         return jsonify({"error": "规则不存在"}), 404
-
-    rules.pop(rule_id)
-    storage.save_rules(rules)
     _reload_all_reasoner_sessions()
 
     return jsonify({"message": "规则删除成功"})
@@ -337,7 +406,10 @@ def get_atoms():
 @require_auth
 def get_conclusions():
     rs = get_reasoner_session(request.session)
-    return jsonify({"conclusions": sorted(rs.get_all_conclusions())})
+    conclusions = sorted(rs.get_all_conclusions())
+    # 在当前已知/假事实下仍可能成立的目标
+    reachable = rs.reasoner.reachable_targets(conclusions)
+    return jsonify({"conclusions": conclusions, "reachable": reachable})
 
 
 @app.route("/api/facts/known", methods=["GET"])
@@ -356,16 +428,29 @@ def set_known_facts():
     facts = data.get("facts", [])
     rs = get_reasoner_session(request.session)
 
-    old_facts = set(rs.known_facts[0])
-    new_facts = set(facts)
-    if old_facts - new_facts:
-        rs.path_all = []
-        rs.known_facts[1] = []
+    removed_facts = set(rs.known_facts[0]) - set(facts)
+    if removed_facts:
+        # 只撤回受影响的推导结果，其余推理进度保留
+        removed, rederived = rs.reasoner.retract(list(removed_facts))
+        gone = set(removed)
+        rs.path_all = [
+            r
+            for r in rs.path_all
+            if r < len(rs.rules)
+            and rs.rules[r][1] not in gone
+            and not gone.intersection(rs.rules[r][0])
+        ]
+        rs.path_all += [r for r in rederived if r not in rs.path_all]
+        rs.known_facts[1] = [f for f in rs.known_facts[1] if f not in gone]
+        for rule_id in rederived:
+            derived = rs.rules[rule_id][1]
+            if derived not in rs.known_facts[1] and derived not in facts:
+                rs.known_facts[1].append(derived)
         rs.backward_in_progress = False
 
     rs.known_facts[0] = facts
-    rs.reasoner.clear_known()
     rs.reasoner.add_known(facts)
+    rs.facts_changed()
     return jsonify({"message": "事实已更新"})
 
 
@@ -397,6 +482,7 @@ def set_false_facts():
     rs.reasoner.clear_false()
     if facts:
         rs.reasoner.add_false(facts)
+    rs.facts_changed()
 
     return jsonify({"message": "事实已更新"})
 
@@ -404,6 +490,30 @@ def set_false_facts():
 # ========== 推理 API ==========
 
 
+def _parse_salience(value, rule_count: int) -> list[float]:
+    """
+    把请求中的显著度 {规则id: 数值} 转为按规则id排列的列表，未给出的规则为 0
+    格式不正确时抛出 ValueError
+    """
+    if not isinstance(value, dict) or not value:
+        raise ValueError("salience 策略需要提供 salience: {规则id: 显著度}")
+    salience = [0.0] * rule_count
+    for key, score in value.items():
+        try:
+            rule_id = int(key)
+        except (TypeError, ValueError):
+            raise ValueError(f"无效的规则id: {key}") from None
+        if not 0 <= rule_id < rule_count:
+            raise ValueError(f"规则不存在: {key}")
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            raise ValueError(f"规则 {key} 的显著度必须是数值")
+        # JSON 解析接受 NaN/Infinity，NaN 无法参与比较排序，一律拒绝
+        if isinstance(score, float) and not math.isfinite(score):
+            raise ValueError(f"规则 {key} 的显著度必须是有限数值")
+        salience[rule_id] = score
+    return salience
+
+
 @app.route("/api/inference/forward", methods=["POST"])
 @require_auth
 def forward_inference():
@@ -412,8 +522,34 @@ def forward_inference():
     if not rs.known_facts[0]:
         return jsonify({"error": "请先添加已知事实"}), 400
 
-    conclusions, path = rs.reasoner.find()
+    # 可选的目标导向推理：只触发能推出目标的规则，stop_on_first 时推出第一个目标即停止
+    data = request.get_json(silent=True) or {}
+    targets = data.get("targets") or None
+    strategy = data.get("strategy")
+    budget = _inference_budget()
+    if strategy:
+        # 基于议程的冲突消解，结论[0]为该策略下优先级最高的结论
+        if strategy not in STRATEGIES:
+            return jsonify({"error": f"未知的冲突消解策略: {strategy}"}), 400
+        salience = None
+        if strategy == "salience":
+            # 显著度按规则id给出，不提供时结果与 order 相同，因此必须提供
+            try:
+                salience = _parse_salience(data.get("salience"), len(rs.rules))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        conclusions, path = rs.reasoner.find_agenda(
+            strategy,
+            salience=salience,
+            stop_on_terminal=data.get("stop_on_terminal", True),
+            budget=budget,
+        )
+    else:
+        conclusions, path = rs.reasoner.find(
+            targets=targets, stop_on_first=bool(data.get("stop_on_first")), budget=budget
+        )
     rs.path_all += [r for r in path if r not in rs.path_all]
+    rs.facts_changed()
 
     for rule_id in path:
         if rule_id < len(rs.rules):
@@ -430,8 +566,15 @@ def forward_inference():
         ],
         "known_facts": rs.known_facts[0],
         "derived_facts": rs.known_facts[1],
+        "status": "success",
     }
 
+    # 预算耗尽时返回部分结果，已推出的事实保留，再次推理从这里继续
+    if budget.exhausted:
+        result["status"] = "budget_exhausted"
+        result["message"] = "推理超出单次预算，已返回部分结果，可再次推理继续"
+        return jsonify(result)
+
     if conclusions:
         storage.add_history(
             {
@@ -460,6 +603,8 @@ def start_backward():
     rs = get_reasoner_session(request.session)
     rs.backward_target = target
     rs.backward_in_progress = True
+    rs.backward_mode = "tree" if data.get("mode") == "tree" else "stack"
+    rs.backward_proof = None
 
     return _continue_backward_internal(rs, request.session)
 
@@ -484,11 +629,139 @@ def continue_backward():
         rs.reasoner.add_false(false_facts)
         rs.false_facts.extend(false_facts)
 
-    return _continue_backward_internal(rs, request.session)
+    return _continue_backward_internal(rs, request.session, true_facts, false_facts)
+
+
+@app.route("/api/inference/backward/plan", methods=["POST"])
+@require_auth
+def backward_plan():
+    """
+    目标的一次性提问计划，按该事实为假时排除的候选证明数从多到少排列
+    客户端可一次回答多个问题，再通过 start/continue 提交；目标已确定时问题列表为空
+    """
+    data = request.json
+    target = data.get("target", "")
+
+    if not target:
+        return jsonify({"error": "请指定目标结论"}), 400
+
+    rs = get_reasoner_session(request.session)
+    budget = _inference_budget()
+    plan = rs.reasoner.question_plan(target, budget)
+    result = {
+        "target": target,
+        "questions": [
+            {"fact": fact, "eliminates": eliminated}
+            for fact, eliminated in plan
+            if fact not in rs.known_facts[0]
+        ],
+        "status": "success",
+    }
+    # 预算耗尽时只返回已评估的问题
+    if budget.exhausted:
+        result["status"] = "budget_exhausted"
+        result["message"] = "提问计划超出单次预算，只返回了部分问题"
+    return jsonify(result)
+
+
+# prove_many 的目标状态
+_TARGET_STATUS = {0: "success", 1: "failed", 2: "query", 3: "budget_exhausted"}
+
+
+@app.route("/api/inference/backward/many", methods=["POST"])
+@require_auth
+def prove_many_backward():
+    """
+    多目标反向推理，各目标共享子目标结果，同一事实只询问一次
+    每次提交本轮回答的事实，返回每个目标的状态和需要确认的事实
+    """
+    data = request.json
+    targets = data.get("targets", [])
+    true_facts = data.get("true_facts", [])
+    false_facts = data.get("false_facts", [])
+
+    if not targets:
+        return jsonify({"error": "请指定目标结论"}), 400
+    # 字符串也可迭代，不校验时会被逐字符当作目标，每个字符都成为新的事实节点
+    if not isinstance(targets, list) or not all(isinstance(t, str) and t for t in targets):
+        return jsonify({"error": "目标结论必须是非空字符串列表"}), 400
+
+    rs = get_reasoner_session(request.session)
+    if true_facts:
+        rs.reasoner.add_known(true_facts)
+        rs.known_facts[0].extend(f for f in true_facts if f not in rs.known_facts[0])
+    if false_facts:
+        rs.reasoner.add_false(false_facts)
+        rs.false_facts.extend(f for f in false_facts if f not in rs.false_facts)
+
+    statuses, query_facts, path = rs.reasoner.prove_many(targets, _inference_budget())
+    rs.facts_changed()
+    rs.path_all += [r for r in path if r not in rs.path_all]
+    for rule_id in path:
+        if rule_id < len(rs.rules):
+            derived = rs.rules[rule_id][1]
+            if derived not in rs.known_facts[1]:
+                rs.known_facts[1].append(derived)
 
+    return jsonify(
+        {
+            "targets": {target: _TARGET_STATUS[status] for target, status in statuses.items()},
+            "query_facts": [f for f in query_facts if f not in rs.known_facts[0]],
+            "path": rs.path_all,
+            "known_facts": rs.known_facts[0],
+            "derived_facts": rs.known_facts[1],
+        }
+    )
 
-def _continue_backward_internal(rs: ReasonerSession, session: dict):
-    status, data, path = rs.reasoner.step_backward(rs.backward_target)
+
+@app.route("/api/inference/backward/tree", methods=["GET"])
+@require_auth
+def backward_tree():
+    """查看目标的预编译决策树"""
+    target = request.args.get("target", "")
+    if not target:
+        return jsonify({"error": "请指定目标结论"}), 400
+
+    rs = get_reasoner_session(request.session)
+    try:
+        return jsonify(rs.reasoner.describe_decision_tree(target, compile=False))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def _resume_backward_proof(rs: ReasonerSession, true_facts: list, false_facts: list):
+    """
+    用会话中保存的 BackwardProof 继续逐步反向推理，返回值与 step_backward 相同
+    没有状态时（新目标、规则变化或从决策树退回）以推理器当前的已知/假事实新建，回答已包含在其中
+    """
+    if rs.backward_proof is None:
+        proof = rs.reasoner.start_proof(rs.backward_target)
+        true_facts, false_facts = [], []
+    else:
+        proof = BackwardProof.from_dict(rs.backward_proof)
+    status, data, path = rs.reasoner.resume_proof(
+        proof, true_facts, false_facts, _inference_budget()
+    )
+    rs.backward_proof = proof.to_dict() if proof.status is None else None
+    # 得证的事实同步到推理器，之后的正向推理和撤回与逐步推理一致
+    rs.reasoner.add_derived(path)
+    return status, data, path
+
+
+def _continue_backward_internal(
+    rs: ReasonerSession,
+    session: dict,
+    true_facts: list | None = None,
+    false_facts: list | None = None,
+):
+    if rs.backward_mode == "tree":
+        try:
+            status, data, path = rs.reasoner.step_decision(rs.backward_target, compile=False)
+        except ValueError:
+            # 决策树尚未编译完成或编译失败，退回逐步反向推理
+            rs.backward_mode = "stack"
+    if rs.backward_mode != "tree":
+        status, data, path = _resume_backward_proof(rs, true_facts or [], false_facts or [])
     rs.path_all += [r for r in path if r not in rs.path_all]
 
     for rule_id in path:
@@ -531,6 +804,10 @@ def _continue_backward_internal(rs: ReasonerSession, session: dict):
         result["status"] = "query"
         result["query_facts"] = [f for f in data if f not in rs.known_facts[0]]
         result["message"] = "需要确认以下事实"
+    elif status == 3:
+        # 推理栈保留，继续推理从中断处接着执行
+        result["status"] = "budget_exhausted"
+        result["message"] = "推理超出单次预算，可继续推理"
 
     return jsonify(result)
 
@@ -541,25 +818,19 @@ def _continue_backward_internal(rs: ReasonerSession, session: dict):
 @app.route("/api/history", methods=["GET"])
 @require_auth
 def get_history():
-    history = storage.load_history()
     username = request.session["username"]
     role = request.session["role"]
 
-    if role != "admin":
-        history = [h for h in history if h.get("username") == username]
-
-    # 按时间倒序排列（最新的在前）
-    history.reverse()
-
+    # 按时间倒序分页（最新的在前），普通用户只能查看自己的记录
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 20, type=int)
-    total = len(history)
-    start = (page - 1) * per_page
-    end = start + per_page
+    history, total = storage.query_history(
+        None if role == "admin" else username, (page - 1) * per_page, per_page
+    )
 
     return jsonify(
         {
-            "history": history[start:end],
+            "history": history,
             "total": total,
             "page": page,
             "per_page": per_page,
@@ -570,21 +841,10 @@ def get_history():
 @app.route("/api/history/<history_id>", methods=["DELETE"])
 @require_auth
 def delete_history(history_id):
-    history = storage.load_history()
     username = request.session["username"]
     role = request.session["role"]
 
-    new_history = []
-    deleted = False
-    for h in history:
-        if h.get("id") == history_id:
-            if role == "admin" or h.get("username") == username:
-                deleted = True
-                continue
-        new_history.append(h)
-
-    if deleted:
-        storage.save_history(new_history)
+    if storage.delete_history(history_id, None if role == "admin" else username):
         return jsonify({"message": "删除成功"})
     return jsonify({"error": "记录不存在或无权删除"}), 404
 
@@ -595,12 +855,7 @@ def clear_history():
     username = request.session["username"]
     role = request.session["role"]
 
-    if role == "admin":
-        storage.save_history([])
-    else:
-        history = storage.load_history()
-        history = [h for h in history if h.get("username") != username]
-        storage.save_history(history)
+    storage.clear_history(None if role == "admin" else username)
 
     return jsonify({"message": "历史已清空"})
 
@@ -623,6 +878,13 @@ def get_users():
     return jsonify({"users": users})
 
 
+@app.route("/api/admin/storage", methods=["GET"])
+@require_admin
+def get_storage_status():
+    """历史写入队列的深度和延迟"""
+    return jsonify(storage.history_queue_stats())
+
+
 @app.route("/api/admin/users/<username>/role", methods=["PUT"])
 @require_admin
 def update_user_role(username):
@@ -632,12 +894,14 @@ def update_user_role(username):
     if new_role not in ["admin", "user"]:
         return jsonify({"error": "无效的角色"}), 400
 
-    users_data = storage.load_users()
-    if username not in users_data.get("users", {}):
-        return jsonify({"error": "用户不存在"}), 404
+    def set_role(users_data: dict) -> bool:
+        if username not in users_data["users"]:
+            return False
+        users_data["users"][username]["role"] = new_role
+        return True
 
-    users_data["users"][username]["role"] = new_role
-    storage.save_users(users_data)
+    if not storage.update_users(set_role):
+        return jsonify({"error": "用户不存在"}), 404
 
     for session in sessions.values():
         if session.get("username") == username:
@@ -652,12 +916,11 @@ def delete_user(username):
     if username == "admin":
         return jsonify({"error": "不能删除管理员账户"}), 400
 
-    users_data = storage.load_users()
-    if username not in users_data.get("users", {}):
-        return jsonify({"error": "用户不存在"}), 404
+    def remove_user(users_data: dict) -> bool:
+        return users_data["users"].pop(username, None) is not None
 
-    del users_data["users"][username]
-    storage.save_users(users_data)
+    if not storage.update_users(remove_user):
+        return jsonify({"error": "用户不存在"}), 404
 
     tokens_to_delete = [t for t, s in sessions.items() if s.get("username") == username]
     for t in tokens_to_delete:
@@ -694,6 +957,7 @@ def start_server(host: str = "0.0.0.0", port: int = 5000) -> tuple[bool, str]:
 
     _server_thread = Thread(target=run_server, daemon=True)
     _server_thread.start()
+    _start_tree_compilation()
     return True, f"服务器已启动，访问地址: http://localhost:{port}"
 
 
@@ -701,8 +965,11 @@ def is_server_running() -> bool:
     return _server_running
 
 
-def run_standalone(host: str = "0.0.0.0", port: int = 5000):
-    """独立运行Web服务器"""
+def run_standalone(host: str = "0.0.0.0", port: int = 5000, storage_backend: str = "json"):
+    """独立运行Web服务器，storage_backend 为存储后端（json / sqlite）"""
+    global storage
+    if storage_backend != "json":
+        storage = DataStorage(backend=storage_backend)
     print("=" * 50)
     print("  专家系统 - Web服务器模式")
     print("=" * 50)
@@ -710,4 +977,5 @@ def run_standalone(host: str = "0.0.0.0", port: int = 5000):
     print("默认管理员: admin / admin123")
     print("按 Ctrl+C 停止服务器")
     print("=" * 50)
+    _start_tree_compilation()
     app.run(host=host, port=port, debug=False)
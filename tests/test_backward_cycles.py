@@ -0,0 +1,50 @@
+"""成环规则库上的反向推理"""
+
+from src.core.budget import Budget
+from src.core.reasoner import RuleReasoner
+
+# A、B 互相推出，B 也可由可询问的 C 推出
+CYCLIC_RULES = [(["B"], "A"), (["A"], "B"), (["C"], "B"), (["A", "E"], "T")]
+
+
+def test_step_backward_stack_stays_bounded_across_budget_continues():
+    """预算耗尽后反复继续，推理栈不随调用次数增长"""
+    rr = RuleReasoner()
+    rr.reset(CYCLIC_RULES)
+    depths = set()
+    for _ in range(5):
+        status, _, _ = rr.step_backward("T", Budget(max_checks=20))
+        depths.add(len(rr._bw_stack))
+
+    assert status == 2
+    assert max(depths) <= 3
+
+
+def test_resume_proof_frames_stay_bounded_across_budget_continues():
+    rr = RuleReasoner()
+    rr.reset(CYCLIC_RULES)
+    proof = rr.start_proof("T")
+    for _ in range(5):
+        status, data, _ = rr.resume_proof(proof, budget=Budget(max_checks=20))
+
+    assert status == 2
+    assert len(proof.frames) <= 3
+
+
+def test_cycle_cut_does_not_mark_dependent_fact_false():
+    """B 只因祖先 A 尚在证明中而失败，A 随后由其他规则得证，之后 B 可以得证"""
+    rules = [(["B"], "A"), (["D"], "A"), (["A"], "B"), (["X"], "B"), (["A"], "T"), (["B"], "G")]
+    rr = RuleReasoner()
+    rr.reset(rules)
+    rr.add_known(["D"])
+    rr.add_false(["X"])
+
+    assert rr.step_backward("T")[0] == 0
+    assert rr.step_backward("G")[0] == 0
+
+    rr.reset(rules)
+    rr.add_known(["D"])
+    rr.add_false(["X"])
+    proof = rr.start_proof("T")
+    assert rr.resume_proof(proof)[0] == 0
+    assert "B" not in proof.false
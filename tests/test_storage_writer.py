@@ -0,0 +1,17 @@
+"""历史记录后台写入线程"""
+
+import atexit
+
+from src.data import DataStorage
+
+
+def test_restart_after_close_registers_atexit_once(tmp_path, monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    storage = DataStorage(str(tmp_path))
+
+    for _ in range(3):
+        storage.add_history({"id": "1", "username": "admin", "type": "forward"})
+        storage.close()
+
+    assert registered == [storage.close]
@@ -0,0 +1,70 @@
+"""Web 推理接口的回归测试"""
+
+import pytest
+
+import src.web.server as server
+from src.data import DataStorage
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "storage", DataStorage(str(tmp_path)))
+    monkeypatch.setattr(server, "sessions", {})
+    client = server.app.test_client()
+    token = client.post(
+        "/api/auth/login", json={"username": "admin", "password": "admin123"}
+    ).json["token"]
+    client.environ_base["HTTP_AUTHORIZATION"] = "Bearer " + token
+    return client
+
+
+def test_continue_sees_facts_set_after_start(client):
+    """开始反向推理后通过事实接口设置的已知/假事实，继续推理时必须生效"""
+    response = client.post("/api/inference/backward/start", json={"target": "金钱豹"})
+    assert response.json["status"] == "query"
+
+    client.post("/api/facts/known", json={"facts": ["吃肉", "毛发"]})
+    client.post("/api/facts/false", json={"facts": ["有奶"]})
+    response = client.post(
+        "/api/inference/backward/continue",
+        json={"true_facts": ["黄褐色", "暗斑点"], "false_facts": []},
+    )
+
+    assert response.json["status"] == "success"
+    assert "金钱豹" in response.json["derived_facts"]
+
+
+def test_query_after_forward_inference_is_not_empty(client):
+    """正向推理推出的事实不会让继续推理询问已知事实"""
+    client.post("/api/inference/backward/start", json={"target": "老虎"})
+    client.post("/api/facts/known", json={"facts": ["毛发", "吃肉"]})
+    client.post("/api/inference/forward", json={})
+    response = client.post(
+        "/api/inference/backward/continue", json={"true_facts": [], "false_facts": []}
+    )
+
+    assert response.json["status"] == "query"
+    assert response.json["query_facts"]
+
+
+
+@pytest.mark.parametrize("targets", ["老虎", ["老虎", ""], ["老虎", 1], {"老虎": 1}])
+def test_prove_many_rejects_invalid_targets(client, targets):
+    """目标不是非空字符串列表时返回 400，字符串不会被逐字符当作目标"""
+    response = client.post("/api/inference/backward/many", json={"targets": targets})
+
+    assert response.status_code == 400
+    assert "error" in response.json
+
+
+@pytest.mark.parametrize("score", ["NaN", "Infinity", "-Infinity"])
+def test_forward_rejects_non_finite_salience(client, score):
+    """JSON 中的 NaN/Infinity 显著度返回 400"""
+    client.post("/api/facts/known", json={"facts": ["毛发"]})
+    response = client.post(
+        "/api/inference/forward",
+        data=f'{{"strategy": "salience", "salience": {{"0": {score}}}}}',
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400